@@ -0,0 +1,32 @@
+"""Add keyset pagination indexes
+
+Revision ID: 7abbd072926e
+Revises: 2296464b3006
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7abbd072926e'
+down_revision: Union[str, None] = '2296464b3006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_documents_owner_id_id', 'documents', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_quizzes_owner_id_id', 'quizzes', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_questions_quiz_id_id', 'questions', ['quiz_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_questions_quiz_id_id', table_name='questions')
+    op.drop_index('ix_quizzes_owner_id_id', table_name='quizzes')
+    op.drop_index('ix_documents_owner_id_id', table_name='documents')
@@ -0,0 +1,98 @@
+"""Move document content to a separate, lz4-compressed table
+
+Revision ID: 8f3a6d2c5e41
+Revises: 4c7e2b9d1f30
+Create Date: 2026-10-18 19:42:17.503861
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a6d2c5e41'
+down_revision: Union[str, None] = '4c7e2b9d1f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match DOCUMENT_SEARCH_VECTOR in app/models.py
+DOCUMENT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce({title}, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({content}, '')), 'B')"
+)
+
+# Must match the statement in app/models.py
+LZ4_COMPRESSION = """DO $$ BEGIN
+    IF current_setting('server_version_num')::int >= 140000 THEN
+        EXECUTE 'ALTER TABLE document_contents ALTER COLUMN content SET COMPRESSION lz4';
+    END IF;
+EXCEPTION WHEN feature_not_supported THEN NULL;
+END $$"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'document_contents',
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('document_id'),
+    )
+    # lz4 (PostgreSQL 14+, when the server is built with it) instead of the default pglz TOAST compression.
+    # Set before the copy so the existing content is recompressed on the way in.
+    op.execute(LZ4_COMPRESSION)
+    op.execute("INSERT INTO document_contents (document_id, content) SELECT id, coalesce(content, '') FROM documents")
+
+    # The generated search_vector cannot reference another table; it becomes a trigger-maintained column
+    op.drop_index('ix_documents_search_vector', table_name='documents')
+    op.drop_column('documents', 'search_vector')
+    op.add_column('documents', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute(f"UPDATE documents SET search_vector = {DOCUMENT_SEARCH_VECTOR.format(title='title', content='content')}")
+    op.create_index('ix_documents_search_vector', 'documents', ['search_vector'], unique=False, postgresql_using='gin')
+    op.execute(f"""CREATE FUNCTION documents_search_vector_title() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := {DOCUMENT_SEARCH_VECTOR.format(
+        title="NEW.title", content="(SELECT content FROM document_contents WHERE document_id = NEW.id)",
+    )};
+    RETURN NEW;
+END $$""")
+    op.execute(
+        "CREATE TRIGGER documents_search_vector BEFORE INSERT OR UPDATE OF title ON documents "
+        "FOR EACH ROW EXECUTE FUNCTION documents_search_vector_title()"
+    )
+    op.execute(f"""CREATE FUNCTION documents_search_vector_content() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE documents SET search_vector = {DOCUMENT_SEARCH_VECTOR.format(title="title", content="NEW.content")}
+    WHERE id = NEW.document_id;
+    RETURN NULL;
+END $$""")
+    op.execute(
+        "CREATE TRIGGER document_contents_search_vector AFTER INSERT OR UPDATE OF content ON document_contents "
+        "FOR EACH ROW EXECUTE FUNCTION documents_search_vector_content()"
+    )
+    op.drop_column('documents', 'content')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('documents', sa.Column('content', sa.Text(), nullable=True))
+    op.execute(
+        "UPDATE documents SET content = document_contents.content "
+        "FROM document_contents WHERE document_contents.document_id = documents.id"
+    )
+    op.execute("DROP TRIGGER document_contents_search_vector ON document_contents")
+    op.execute("DROP TRIGGER documents_search_vector ON documents")
+    op.execute("DROP FUNCTION documents_search_vector_content()")
+    op.execute("DROP FUNCTION documents_search_vector_title()")
+    op.drop_index('ix_documents_search_vector', table_name='documents')
+    op.drop_column('documents', 'search_vector')
+    op.add_column('documents', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(DOCUMENT_SEARCH_VECTOR.format(title='title', content='content'), persisted=True), nullable=True,
+    ))
+    op.create_index('ix_documents_search_vector', 'documents', ['search_vector'], unique=False, postgresql_using='gin')
+    op.drop_table('document_contents')
@@ -0,0 +1,52 @@
+"""Add full-text search vectors and trigram title index
+
+Revision ID: 9b4f1d6e2a87
+Revises: e3a9c7b25f14
+Create Date: 2026-10-18 15:11:04.286913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4f1d6e2a87'
+down_revision: Union[str, None] = 'e3a9c7b25f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match DOCUMENT_SEARCH_VECTOR / QUESTION_SEARCH_VECTOR in app/models.py
+DOCUMENT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+QUESTION_SEARCH_VECTOR = "to_tsvector('english', coalesce(text, ''))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('documents', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(DOCUMENT_SEARCH_VECTOR, persisted=True), nullable=True,
+    ))
+    op.create_index('ix_documents_search_vector', 'documents', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_documents_title_trgm', 'documents', ['title'], unique=False,
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'},
+    )
+    op.add_column('questions', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(QUESTION_SEARCH_VECTOR, persisted=True), nullable=True,
+    ))
+    op.create_index('ix_questions_search_vector', 'questions', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_questions_search_vector', table_name='questions')
+    op.drop_column('questions', 'search_vector')
+    op.drop_index('ix_documents_title_trgm', table_name='documents')
+    op.drop_index('ix_documents_search_vector', table_name='documents')
+    op.drop_column('documents', 'search_vector')
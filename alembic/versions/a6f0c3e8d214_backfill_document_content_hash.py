@@ -0,0 +1,31 @@
+"""Backfill document content hashes
+
+Revision ID: a6f0c3e8d214
+Revises: d41c8a7e5b92
+Create Date: 2026-10-19 14:21:50.836127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6f0c3e8d214'
+down_revision: Union[str, None] = 'd41c8a7e5b92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows written before uploads maintained the hash, and by the batch endpoint; must match app.uploads.content_hash
+    op.execute(
+        "UPDATE documents SET content_hash = encode(sha256(convert_to(document_contents.content, 'UTF8')), 'hex') "
+        "FROM document_contents WHERE document_contents.document_id = documents.id AND documents.content_hash IS NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass  # The hashes stay valid for the content they describe
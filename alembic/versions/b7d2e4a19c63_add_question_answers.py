@@ -0,0 +1,30 @@
+"""Add correct answer and explanation to questions
+
+Revision ID: b7d2e4a19c63
+Revises: 8f3a6d2c5e41
+Create Date: 2026-10-19 10:12:44.831205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4a19c63'
+down_revision: Union[str, None] = '8f3a6d2c5e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('questions', sa.Column('correct_answer', sa.Text(), nullable=True))
+    op.add_column('questions', sa.Column('explanation', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('questions', 'explanation')
+    op.drop_column('questions', 'correct_answer')
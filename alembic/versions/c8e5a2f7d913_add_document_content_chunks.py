@@ -0,0 +1,64 @@
+"""Add compressed document content chunks for byte range reads
+
+Revision ID: c8e5a2f7d913
+Revises: a6f0c3e8d214
+Create Date: 2026-10-19 16:05:12.273419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import zstandard
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e5a2f7d913'
+down_revision: Union[str, None] = 'a6f0c3e8d214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Defaults of document_chunk_bytes and document_compression_level in app/config.py
+CHUNK_BYTES = 256 * 1024
+COMPRESSION_LEVEL = 3
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    chunks = op.create_table(
+        'document_content_chunks',
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('byte_offset', sa.BigInteger(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('document_id', 'byte_offset'),
+    )
+    # Staged rows only live inside an upload's transaction, so none are committed here
+    op.add_column('document_upload_chunks', sa.Column('byte_offset', sa.BigInteger(), nullable=False))
+    op.add_column('document_upload_chunks', sa.Column('size', sa.Integer(), nullable=False))
+    op.add_column('document_upload_chunks', sa.Column('packed', sa.LargeBinary(), nullable=False))
+
+    # Existing documents, one at a time so memory stays bounded by the largest document
+    conn = op.get_bind()
+    compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+    ids = conn.execute(sa.text("SELECT document_id FROM document_contents ORDER BY document_id")).scalars().all()
+    for document_id in ids:
+        content = conn.execute(
+            sa.text("SELECT content FROM document_contents WHERE document_id = :id"), {"id": document_id}
+        ).scalar()
+        encoded = content.encode("utf-8")
+        rows = []
+        for offset in range(0, len(encoded), CHUNK_BYTES):
+            part = encoded[offset:offset + CHUNK_BYTES]
+            rows.append({"document_id": document_id, "byte_offset": offset, "size": len(part), "data": compressor.compress(part)})
+        if rows:
+            op.bulk_insert(chunks, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('document_upload_chunks', 'packed')
+    op.drop_column('document_upload_chunks', 'size')
+    op.drop_column('document_upload_chunks', 'byte_offset')
+    op.drop_table('document_content_chunks')
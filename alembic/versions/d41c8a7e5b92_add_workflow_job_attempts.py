@@ -0,0 +1,28 @@
+"""Add attempts to workflow jobs
+
+Revision ID: d41c8a7e5b92
+Revises: b7d2e4a19c63
+Create Date: 2026-10-19 10:48:03.417692
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c8a7e5b92'
+down_revision: Union[str, None] = 'b7d2e4a19c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workflow_jobs', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workflow_jobs', 'attempts')
@@ -0,0 +1,37 @@
+"""Add document content hash and upload staging table
+
+Revision ID: e3a9c7b25f14
+Revises: 5d8e2f1a6c3b
+Create Date: 2026-10-18 14:02:37.415208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a9c7b25f14'
+down_revision: Union[str, None] = '5d8e2f1a6c3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_documents_owner_id_content_hash', 'documents', ['owner_id', 'content_hash'], unique=False)
+    op.create_table('document_upload_chunks',
+    sa.Column('upload_id', sa.String(length=32), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('upload_id', 'seq')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('document_upload_chunks')
+    op.drop_index('ix_documents_owner_id_content_hash', table_name='documents')
+    op.drop_column('documents', 'content_hash')
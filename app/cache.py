@@ -0,0 +1,196 @@
+import hashlib
+import itertools
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from starlette.requests import Request
+from starlette.responses import Response
+from .config import settings
+from .schemas import QUIZ_EXPANSIONS, USER_EXPANSIONS
+
+# A cached response: (etag, JSON body)
+Entry = Tuple[str, bytes]
+
+
+class CacheBackend:
+    """Shared cache tier used behind the in-process LRU (e.g. Redis)."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+
+class InMemoryBackend(CacheBackend):
+    """Process-local stand-in for a shared backend; used for tests and single-node runs."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+
+class RedisBackend(CacheBackend):
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("A redis:// cache_url requires the 'redis' package") from e
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*keys)
+
+
+class LocalLRU:
+    """Bounded in-process TTL/LRU tier."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Entry]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Entry]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: Entry) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, entry)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _expand_variants(expansions) -> List[str]:
+    # Every canonical ?expand= value for an entity, including no expansion
+    fields = sorted(expansions)
+    return [",".join(combo) for n in range(len(fields) + 1) for combo in itertools.combinations(fields, n)]
+
+
+# Expansions that are served from the cache; user responses with nested questions are not
+# cached because question writes do not know the quiz owner to invalidate.
+CACHE_VARIANTS = {
+    "user": _expand_variants(USER_EXPANSIONS - {"quizzes.questions"}),
+    "document": [""],
+    "quiz": _expand_variants(QUIZ_EXPANSIONS),
+    "question": [""],
+}
+
+
+def cache_key(entity: str, entity_id: int, expand: set = frozenset()) -> Optional[str]:
+    variant = ",".join(sorted(expand))
+    if variant not in CACHE_VARIANTS[entity]:
+        return None
+    return f"resp:{entity}:{entity_id}:{variant}"
+
+
+class ResponseCache:
+    """Read-through cache for GET responses: in-process LRU in front of an optional shared backend."""
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: int, local_ttl: float, max_entries: int, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.local = LocalLRU(max_entries, local_ttl)
+        self.enabled = enabled
+
+    async def get(self, key: Optional[str]) -> Optional[Entry]:
+        if not self.enabled or key is None:
+            return None
+        entry = self.local.get(key)
+        if entry is not None or self.backend is None:
+            return entry
+        raw = await self.backend.get(key)
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b"\n")
+        entry = (etag.decode(), body)
+        self.local.set(key, entry)
+        return entry
+
+    async def set(self, key: Optional[str], body: bytes) -> Entry:
+        entry = (make_etag(body), body)
+        if not self.enabled or key is None:
+            return entry
+        self.local.set(key, entry)
+        if self.backend is not None:
+            await self.backend.set(key, entry[0].encode() + b"\n" + body, self.ttl)
+        return entry
+
+    async def invalidate(self, entity: str, *entity_ids: int) -> None:
+        keys = [f"resp:{entity}:{entity_id}:{variant}" for entity_id in set(entity_ids) for variant in CACHE_VARIANTS[entity]]
+        self.local.delete(*keys)
+        if self.backend is not None and keys:
+            await self.backend.delete(*keys)
+
+
+def create_backend(url: Optional[str]) -> Optional[CacheBackend]:
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryBackend()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported cache_url: {url}")
+
+
+response_cache = ResponseCache(
+    backend=create_backend(settings.cache_url),
+    ttl=settings.cache_ttl_seconds,
+    local_ttl=settings.cache_local_ttl_seconds,
+    max_entries=settings.cache_local_max_entries,
+    enabled=settings.cache_enabled,
+)
+
+
+def etag_response(request: Request, entry: Entry) -> Response:
+    # 304 with no body when the client already holds this representation
+    etag, body = entry
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == etag:
+                # Echo the client's form: CompressionMiddleware weakens the ETag of encoded 200s
+                return Response(status_code=304, headers={"ETag": etag if tag == "*" else tag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
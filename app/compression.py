@@ -0,0 +1,131 @@
+import zlib
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = (b"text/", b"application/json", b"application/xml", b"application/javascript")
+# Event streams must reach the client frame by frame; partial and bodiless responses have nothing to encode
+SKIPPED_TYPES = (b"text/event-stream",)
+SKIPPED_STATUSES = {204, 206, 304}
+# Larger chunks are compressed in a worker thread (zlib and brotli release the GIL) so the loop keeps serving
+THREAD_THRESHOLD = 256 * 1024
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick br (when brotli is installed) or gzip from an Accept-Encoding header, honouring q=0."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    for coding in ("br", "gzip") if brotli is not None else ("gzip",):
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+class _Encoder:
+    def __init__(self, coding: str):
+        if coding == "br":
+            compressor = brotli.Compressor(quality=settings.compression_brotli_quality)
+            self._process, self._finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+            self._process, self._finish = compressor.compress, compressor.flush
+
+    async def process(self, data: bytes) -> bytes:
+        if len(data) > THREAD_THRESHOLD:
+            return await run_in_threadpool(self._process, data)
+        return self._process(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware: gzip, or brotli when installed, for text and JSON responses.
+
+    Bodies under compression_minimum_bytes, event streams, 204/206/304 responses, HEAD requests and
+    responses that already carry a Content-Encoding pass through untouched. Streaming bodies are
+    encoded chunk by chunk without buffering. Encoded responses get Vary: Accept-Encoding and a weak
+    ETag, since their bytes differ from the identity representation the strong ETag describes.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        coding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                coding = negotiate(value.decode("latin-1"))
+                break
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        encoder = None  # Set once the response is being encoded; passthrough stays None after start is sent
+
+        async def send_compressed(message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if (
+                    message["status"] in SKIPPED_STATUSES
+                    or b"content-encoding" in headers
+                    or content_type.startswith(SKIPPED_TYPES)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES) and b"json" not in content_type
+                    or int(headers.get(b"content-length", self.minimum_size)) < self.minimum_size
+                ):
+                    await send(message)
+                else:
+                    start = message  # Held until the first body chunk shows whether it is worth encoding
+                return
+            if message["type"] != "http.response.body" or start is None:
+                return await send(message)
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    await send(start)
+                    start = None
+                    return await send(message)
+                encoder = _Encoder(coding)
+                headers = [
+                    (name, value) for name, value in start.get("headers", [])
+                    if name not in (b"content-length", b"vary", b"etag")
+                ]
+                original = dict(start.get("headers", []))
+                vary = original.get(b"vary")
+                headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+                etag = original.get(b"etag")
+                if etag:
+                    headers.append((b"etag", etag if etag.startswith(b"W/") else b"W/" + etag))
+                headers.append((b"content-encoding", coding.encode()))
+                data = await encoder.process(body)
+                if not more_body:
+                    data += encoder.finish()
+                    headers.append((b"content-length", str(len(data)).encode()))
+                await send({**start, "headers": headers})
+            else:
+                data = await encoder.process(body)
+                if not more_body:
+                    data += encoder.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
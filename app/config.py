@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal, Optional
 
 class Settings(BaseSettings):
     app_name: str = "My FastAPI Application"
@@ -13,8 +13,120 @@ class Settings(BaseSettings):
         "http://127.0.0.1:8080",
         "*"  # Allow all origins (development only)
     ]
-    debug: bool = True
+    debug: bool = False  # run_server.py: single process with auto-reload (development only)
+    metrics_enabled: bool = True  # Prometheus /metrics, per-route latency histograms and DB timing
+    health_check_timeout_seconds: float = 2.0
     database_url: str  # Loaded from .env
+    database_replica_url: Optional[str] = None  # Read replica for GET routes; falls back to database_url
+
+    # Production server (run_server.py when debug is off): prefork workers sharing one socket
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0  # 0 = one per CPU available to the process (affinity and cgroup quota)
+    server_loop: Literal["auto", "asyncio", "uvloop"] = "uvloop"
+    server_http: Literal["auto", "h11", "httptools"] = "httptools"
+    server_preload: bool = True  # Import the app and load the embedding model once, before fork
+    server_backlog: int = 2048
+    server_keep_alive_seconds: int = 5
+    server_graceful_timeout_seconds: int = 30  # For in-flight requests after SIGTERM, before jobs drain
+    server_access_log: bool = True
+    metrics_multiprocess_dir: str = ".cache/prometheus"  # Shared by workers so /metrics covers all of them
+
+    # Engine / connection pool
+    db_echo: bool = False  # Log every SQL statement (expensive, debugging only)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # Seconds before a pooled connection is replaced
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 500  # asyncpg prepared statements cached per connection
+    db_pool_warm_connections: int = 4  # Opened at startup so the first requests skip connection setup
+    # Startup schema handling: "alembic" checks the database is at the migration head and refuses to
+    # start otherwise; "create_all" creates missing tables (local development only); "off" skips both
+    schema_check: Literal["alembic", "create_all", "off"] = "alembic"
+    max_batch_size: int = 10000  # Max items per batch create / batch get request
+    page_size_default: int = 50
+    page_size_max: int = 500
+
+    # Streaming document upload and ranged content reads
+    upload_max_bytes: int = 50 * 1024 * 1024
+    document_chunk_bytes: int = 256 * 1024  # Staged upload chunk / stored content slice size
+    document_compression_level: int = 3  # zstd level for the stored content slices
+
+    # Response compression: br when the optional brotli package is installed, otherwise gzip
+    compression_enabled: bool = True
+    compression_minimum_bytes: int = 1024  # Smaller bodies are sent as is
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4  # 0-11; higher levels cost far more CPU per response
+
+    # Idempotency-Key on POST routes: a retry with the same key replays the first response
+    idempotency_enabled: bool = True
+    idempotency_ttl_seconds: int = 24 * 3600
+    idempotency_lock_seconds: int = 300  # A reservation still unfinished after this long (crashed worker) is taken over
+    idempotency_max_response_bytes: int = 1024 * 1024  # Larger responses are not stored; the key is released
+
+    # Response cache for GET by id routes
+    cache_enabled: bool = True
+    cache_url: Optional[str] = None  # Shared tier: redis://... or memory:// (in-process fake)
+    cache_ttl_seconds: int = 300
+    cache_local_ttl_seconds: float = 5.0  # Short, bounds staleness across workers
+    cache_local_max_entries: int = 10000
+
+    # LLM (Ollama, OpenAI-compatible API)
+    ollama_host: str = "http://localhost:11434"
+    ollama_api_key: str = "ollama"
+    ollama_model: str = "llama3.2"
+    llm_timeout_seconds: float = 120.0  # Per request
+    llm_max_retries: int = 3  # Retries with exponential backoff on connection errors, 429 and 5xx
+    llm_max_concurrency: int = 8  # In-flight generations per process
+
+    # Rate limits and admission control for quiz generation (one LLM backend serves every request)
+    ratelimit_enabled: bool = True
+    ratelimit_url: Optional[str] = None  # redis://... shares buckets across workers; default is in-memory per process
+    ratelimit_user_per_minute: float = 6.0
+    ratelimit_user_burst: int = 3
+    ratelimit_global_per_minute: float = 60.0
+    ratelimit_global_burst: int = 20
+    admission_max_running: int = 4  # Quiz pipeline runs at once per process, streams and jobs together
+    admission_max_waiting: int = 16  # Streaming requests beyond this are refused with 503 and Retry-After
+    admission_max_wait_seconds: float = 30.0
+
+    # Quiz generation
+    quiz_num_questions: int = 10  # Questions per document in batch mode
+    quiz_chunk_tokens: int = 1500  # Approximate prompt budget for each document chunk
+    generation_cache_enabled: bool = True
+    generation_cache_dir: str = ".cache/generation"
+    generation_cache_max_bytes: int = 256 * 1024 * 1024
+
+    # Conversation memory (Qdrant + sentence-transformers)
+    qdrant_host: str = "localhost"
+    qdrant_port: int = 6333
+    memory_enabled: bool = True  # Start the embedding/vector store provider in the API lifespan
+    memory_warm_up: bool = True  # Run one encode at startup so the first request does not pay for it
+    embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_dim: int = 384
+    memory_backend: str = "qdrant"  # "qdrant" or "numpy" (in-process brute force, tests/small deployments)
+    memory_top_k: int = 5
+    embedding_workers: int = 2  # Threads for embedding and blocking vector store calls
+    embedding_batch_size: int = 64
+
+    # Workflow checkpoints
+    checkpoint_backend: str = "database"  # "database" (application engine) or "sqlite" (local file)
+    checkpoint_sqlite_path: str = ".cache/checkpoints.db"
+    checkpoint_sqlite_mmap_bytes: int = 256 * 1024 * 1024
+    checkpoint_keep: int = 5  # Steps kept per thread; older checkpoints are pruned
+    checkpoint_compression_level: int = 6
+
+    # Background quiz generation jobs
+    jobs_enabled: bool = True  # Run job workers inside the API process
+    jobs_concurrency: int = 4  # Jobs running at once per process
+    jobs_max_pending: int = 1000  # Submissions are refused with 503 beyond this backlog
+    jobs_poll_interval_seconds: float = 2.0
+    jobs_heartbeat_seconds: float = 10.0
+    jobs_stale_after_seconds: float = 60.0  # Running jobs without a heartbeat this long are requeued
+    jobs_max_attempts: int = 3  # Jobs whose worker died this many times are failed instead of requeued
+    jobs_drain_timeout_seconds: float = 30.0  # Shutdown grace period for running jobs
+    jobs_retry_after_seconds: int = 30
 
     class Config:
         env_file = ".env"
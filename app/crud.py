@@ -0,0 +1,88 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Type
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import Base
+
+
+# Multi-row INSERT ... RETURNING; ids come back in the same order as rows
+async def bulk_insert(db: AsyncSession, model: Type[Base], rows: List[Dict]) -> List[int]:
+    if not rows:
+        return []
+    result = await db.scalars(
+        insert(model).returning(model.id, sort_by_parameter_order=True),
+        rows,
+    )
+    return list(result)
+
+
+# Multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING, in one statement; None for rows whose
+# unique_column value already exists. Values of unique_column must be distinct within rows.
+async def bulk_insert_new(db: AsyncSession, model: Type[Base], rows: List[Dict], unique_column) -> List[Optional[int]]:
+    if not rows:
+        return []
+    stmt = (
+        dialect_insert(db.bind.dialect.name, model.__table__)
+        .on_conflict_do_nothing(index_elements=[unique_column])
+        .returning(model.id, unique_column)
+    )
+    created = {value: id for id, value in await db.execute(stmt, rows)}
+    return [created.get(row[unique_column.key]) for row in rows]
+
+
+# select(Model) yields instances; a select of columns (including the id) yields Row objects
+def _rows(result, query, model: Type[Base]) -> list:
+    return list(result.scalars() if query.column_descriptions[0]["expr"] is model else result)
+
+
+# Load many rows with a single IN query, preserving the order of the requested ids
+async def get_many(db: AsyncSession, model: Type[Base], ids: Sequence[int], query=None) -> list:
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        return []
+    query = select(model) if query is None else query
+    result = await db.execute(query.filter(model.id.in_(unique_ids)))
+    by_id = {row.id: row for row in _rows(result, query, model)}
+    return [by_id[i] for i in unique_ids if i in by_id]
+
+
+# Return the subset of ids that exist for the given model
+async def existing_ids(db: AsyncSession, model: Type[Base], ids: Iterable[int]) -> set:
+    unique_ids = set(ids)
+    if not unique_ids:
+        return set()
+    result = await db.execute(select(model.id).filter(model.id.in_(unique_ids)))
+    return set(result.scalars())
+
+
+# Keyset (cursor) pagination ordered by id; fetches one extra row to detect the next page
+async def keyset_page(db: AsyncSession, query, model: Type[Base], after: Optional[int], limit: int):
+    if after is not None:
+        query = query.filter(model.id > after)
+    result = await db.execute(query.order_by(model.id).limit(limit + 1))
+    rows = _rows(result, query, model)
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+# Dialect-specific INSERT that supports ON CONFLICT (PostgreSQL and SQLite)
+def dialect_insert(dialect_name: str, table):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table)
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table)
+    raise NotImplementedError(f"ON CONFLICT is not supported for dialect {dialect_name}")
+
+
+
+# Scalar subquery concatenating a text column over the matching rows in order_by order
+def ordered_concat(dialect_name: str, column, order_by, *criteria):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import aggregate_order_by
+        aggregated = select(func.string_agg(column, aggregate_order_by(literal(""), order_by))).where(*criteria)
+    else:
+        # SQLite's group_concat follows the order of an ordered subquery
+        rows = select(column.label("part")).where(*criteria).order_by(order_by).subquery()
+        aggregated = select(func.group_concat(rows.c.part, ""))
+    return func.coalesce(aggregated.scalar_subquery(), "")
@@ -1,20 +1,90 @@
+import asyncio
+import os
+from functools import lru_cache
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
+def engine_options(url: str) -> dict:
+    parsed = make_url(url)
+    options = {
+        "echo": settings.db_echo,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+    # SQLite (tests, benchmarks) uses its own pool classes without size limits
+    if parsed.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+        )
+    if parsed.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+    return options
+
 # Create async SQLAlchemy engine
-engine = create_async_engine(settings.database_url, echo=True)
+engine = create_async_engine(settings.database_url, **engine_options(settings.database_url))
+
+# Read-only engine for GET routes; shares the primary engine when no replica is configured
+if settings.database_replica_url:
+    read_engine = create_async_engine(settings.database_replica_url, **engine_options(settings.database_replica_url))
+else:
+    read_engine = engine
 
 # Create async session factory
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
+AsyncReadSessionLocal = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 # Base class for models
 Base = declarative_base()
 
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "alembic.ini")
+
+@lru_cache(maxsize=None)
+def alembic_heads() -> frozenset:
+    # Read from the migration scripts once per process (before forking workers, the parent's copy is reused)
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    return frozenset(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+
+async def check_schema(engine) -> None:
+    """Fail fast unless the database is stamped at the alembic head; one query, no catalog introspection."""
+    expected = alembic_heads()
+    async with engine.connect() as conn:
+        try:
+            current = frozenset((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+        except Exception:
+            current = frozenset()
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is at {sorted(current) or 'no revision'}, expected alembic head {sorted(expected)}; "
+            "run `alembic upgrade head` before starting the app"
+        )
+
+async def ping(engine) -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def warm_pool(engine, connections: int) -> None:
+    # Open connections concurrently; they stay in the pool for the first requests
+    if hasattr(engine.pool, "size"):
+        connections = min(connections, engine.pool.size())
+    await asyncio.gather(*(ping(engine) for _ in range(connections)))
+
 # Dependency to get async DB session
 async def get_db():
     async with AsyncSessionLocal() as db:
-        yield db
\ No newline at end of file
+        yield db
+
+# Dependency to get async DB session on the read replica
+async def get_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
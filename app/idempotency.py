@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import and_, delete, or_, select, update
+from .config import settings
+from .crud import dialect_insert
+from .database import AsyncSessionLocal
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying are not stored: the key is released and the retry runs the route again
+RETRYABLE_STATUSES = {408, 409, 425, 429}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def _send_json(send, status: int, body: dict, headers: Optional[list] = None) -> None:
+    payload = json.dumps(body).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())] + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware: a POST with an Idempotency-Key header runs once; retries replay the response.
+
+    The key is reserved with INSERT ... ON CONFLICT DO NOTHING before the route runs, so a retry that
+    arrives while the first request is still running gets 409 rather than a second execution. The
+    request fingerprint (method, path, query string, body) must match on replay, otherwise 422. 5xx
+    and throttling responses release the key. A reservation left unfinished for
+    idempotency_lock_seconds (worker crashed mid-request) is taken over by the next retry.
+    """
+
+    def __init__(self, app, header: str = "idempotency-key"):
+        self.app = app
+        self.header = header.encode()
+        self._next_purge = 0.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        key = None
+        for name, value in scope["headers"]:
+            if name == self.header:
+                key = value.decode("latin-1").strip()
+                break
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > 255:
+            return await _send_json(send, 400, {"detail": "Idempotency-Key must be 1 to 255 characters"})
+
+        stored = await self._reserve(key)
+        fingerprint = hashlib.sha256(f"{scope['method']} {scope['path']}?{scope['query_string'].decode('latin-1')}\n".encode())
+        if stored is not None:
+            if stored.status_code is None:
+                return await _send_json(send, 409, {"detail": "A request with this Idempotency-Key is in progress"})
+            while True:
+                message = await receive()
+                fingerprint.update(message.get("body", b""))
+                if message["type"] != "http.request" or not message.get("more_body"):
+                    break
+            if fingerprint.hexdigest() != stored.fingerprint:
+                return await _send_json(send, 422, {"detail": "Idempotency-Key was already used for a different request"})
+            await send({
+                "type": "http.response.start",
+                "status": stored.status_code,
+                "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in stored.headers] + [(b"idempotent-replayed", b"true")],
+            })
+            await send({"type": "http.response.body", "body": stored.body})
+            return
+
+        body_read = False
+        status, headers, chunks, size, complete = None, [], [], 0, False
+
+        async def receive_hashed():
+            nonlocal body_read
+            message = await receive()
+            if message["type"] == "http.request":
+                fingerprint.update(message.get("body", b""))
+                body_read = not message.get("more_body")
+            return message
+
+        async def send_captured(message):
+            nonlocal status, headers, size, complete
+            if message["type"] == "http.response.start":
+                status, headers = message["status"], list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                size += len(body)
+                if size <= settings.idempotency_max_response_bytes:
+                    chunks.append(body)
+                complete = not message.get("more_body")
+            await send(message)
+
+        try:
+            await self.app(scope, receive_hashed, send_captured)
+            # Routes that fail before reading the body still need the whole body in the fingerprint
+            while not body_read:
+                message = await receive()
+                if message["type"] != "http.request":
+                    break
+                fingerprint.update(message.get("body", b""))
+                body_read = not message.get("more_body")
+        except BaseException:
+            await self._release(key)
+            raise
+        if not (complete and body_read) or status >= 500 or status in RETRYABLE_STATUSES or size > settings.idempotency_max_response_bytes:
+            await self._release(key)
+            return
+        await self._store(key, fingerprint.hexdigest(), status, headers, b"".join(chunks))
+
+    async def _reserve(self, key: str) -> Optional[IdempotencyKey]:
+        """Reserve key for this request (returns None) or return the row of an earlier request with it."""
+        now = _now()
+        async with AsyncSessionLocal() as db:
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + 60
+                await db.execute(delete(IdempotencyKey).where(
+                    IdempotencyKey.created_at < now - timedelta(seconds=settings.idempotency_ttl_seconds)
+                ))
+            stmt = dialect_insert(db.bind.dialect.name, IdempotencyKey.__table__).values(key=key, created_at=now)
+            reserved = (await db.execute(stmt.on_conflict_do_nothing(index_elements=[IdempotencyKey.key]))).rowcount == 1
+            if not reserved:
+                # Expired keys, and reservations abandoned by a crashed worker, are taken over
+                reserved = (await db.execute(
+                    update(IdempotencyKey)
+                    .where(
+                        IdempotencyKey.key == key,
+                        or_(
+                            IdempotencyKey.created_at < now - timedelta(seconds=settings.idempotency_ttl_seconds),
+                            and_(
+                                IdempotencyKey.status_code.is_(None),
+                                IdempotencyKey.created_at < now - timedelta(seconds=settings.idempotency_lock_seconds),
+                            ),
+                        ),
+                    )
+                    .values(created_at=now, fingerprint=None, status_code=None, headers=None, body=None)
+                )).rowcount == 1
+            stored = None if reserved else await db.scalar(select(IdempotencyKey).where(IdempotencyKey.key == key))
+            await db.commit()
+            return stored
+
+    async def _store(self, key: str, fingerprint: str, status: int, headers: list, body: bytes) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.key == key)
+                    .values(
+                        fingerprint=fingerprint,
+                        status_code=status,
+                        headers=[[k.decode("latin-1"), v.decode("latin-1")] for k, v in headers],
+                        body=body,
+                    )
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to store response for idempotency key {key}: {str(e)}")
+
+    async def _release(self, key: str) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)))
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to release idempotency key {key}: {str(e)}")
@@ -0,0 +1,236 @@
+import asyncio
+import contextlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+from .database import AsyncSessionLocal
+from .models import WorkflowJob
+from .ratelimit import admission
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"low": 0, "normal": 5, "high": 10}
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+_graphs = {}
+
+def quiz_graph(batch: bool):
+    # Imported lazily so the API can start without the LLM/vector store stack
+    from app.langgraph.workflow import build_workflow
+    if batch not in _graphs:
+        _graphs[batch] = build_workflow(batch=batch)
+    return _graphs[batch]
+
+
+def quiz_state(session_id: str, user_id: int, document_id: int, num_questions: Optional[int] = None) -> dict:
+    return {
+        "session_id": session_id,
+        "user_id": user_id,
+        "document_id": document_id,
+        "document_text": None,  # Already stored; save_text loads it into the state
+        "num_questions": num_questions,
+        "conversation_history": [],
+    }
+
+
+@contextlib.asynccontextmanager
+async def one_off_thread(graph, thread_id: str):
+    # Job and stream runs always start from fresh input and are never resumed, so their
+    # checkpoints are deleted once the run ends instead of accumulating per thread_id
+    try:
+        yield {"thread_id": thread_id}
+    finally:
+        try:
+            await graph.checkpointer.adelete_thread(thread_id)
+        except Exception as e:
+            logger.warning(f"Could not delete checkpoints of thread {thread_id}: {str(e)}")
+
+
+async def run_quiz_workflow(job: WorkflowJob) -> dict:
+    state = quiz_state(f"job-{job.id}", job.user_id, job.document_id, job.params.get("num_questions"))
+    graph = quiz_graph(job.params.get("batch", True))
+    # Jobs share the streaming routes' admission slots but wait for one instead of being refused
+    async with admission.slot(reject=False), AsyncSessionLocal() as db:
+        async with one_off_thread(graph, f"job-{job.id}") as configurable:
+            final = await graph.ainvoke(state, config={"configurable": {**configurable, "db": db}})
+    return {"quiz_id": final.get("quiz_id"), "question_ids": final.get("question_ids")}
+
+
+class JobQueue:
+    """Bounded asyncio worker pool over the persistent workflow_jobs table.
+
+    Workers claim the highest-priority pending job with FOR UPDATE SKIP LOCKED, so several
+    processes can share the queue. Running jobs heartbeat; jobs whose worker died are put
+    back to pending once their heartbeat goes stale, up to jobs_max_attempts claims.
+    """
+
+    def __init__(self, runner: Callable[[WorkflowJob], Awaitable[dict]] = run_quiz_workflow):
+        self.runner = runner
+        self._workers = []
+        self._monitor: Optional[asyncio.Task] = None
+        self._running: Dict[int, asyncio.Task] = {}
+        self._requeue = set()
+        self._accepting = False
+        self._wakeup = asyncio.Event()
+
+    async def submit(self, db: AsyncSession, document_id: int, user_id: int, priority: int, params: dict) -> WorkflowJob:
+        # Backpressure: refuse new work once the pending backlog is full
+        pending = await db.scalar(select(func.count()).select_from(WorkflowJob).where(WorkflowJob.status == "pending"))
+        if pending >= settings.jobs_max_pending:
+            raise QueueFull()
+        job = WorkflowJob(document_id=document_id, user_id=user_id, priority=priority, params=params, status="pending", cancel_requested=False)
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        self._wakeup.set()
+        return job
+
+    async def cancel(self, db: AsyncSession, job: WorkflowJob) -> WorkflowJob:
+        if job.status == "pending":
+            result = await db.execute(
+                update(WorkflowJob)
+                .where(WorkflowJob.id == job.id, WorkflowJob.status == "pending")
+                .values(status="cancelled", finished_at=_now())
+            )
+            await db.commit()
+            if result.rowcount:
+                await db.refresh(job)
+                return job
+        # Running (possibly in another process): flag it; the owning worker cancels it on its next heartbeat
+        await db.execute(update(WorkflowJob).where(WorkflowJob.id == job.id).values(cancel_requested=True))
+        await db.commit()
+        task = self._running.get(job.id)
+        if task is not None:
+            task.cancel()
+        await db.refresh(job)
+        return job
+
+    async def start(self):
+        self._accepting = True
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(settings.jobs_concurrency)]
+        self._monitor = asyncio.create_task(self._heartbeat())
+
+    async def stop(self, timeout: float):
+        """Stop claiming jobs, give running jobs `timeout` seconds to finish, then requeue the rest."""
+        self._accepting = False
+        self._wakeup.set()
+        if self._workers:
+            await asyncio.wait(self._workers, timeout=timeout)
+        for job_id, task in list(self._running.items()):
+            self._requeue.add(job_id)
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+        self._workers, self._monitor = [], None
+
+    async def _worker(self):
+        while self._accepting:
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Failed to claim job: {str(e)}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.jobs_poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _claim(self) -> Optional[WorkflowJob]:
+        next_id = (
+            select(WorkflowJob.id)
+            .where(WorkflowJob.status == "pending")
+            .order_by(WorkflowJob.priority.desc(), WorkflowJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        now = _now()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(WorkflowJob)
+                .where(WorkflowJob.id == next_id, WorkflowJob.status == "pending")
+                .values(status="running", started_at=now, heartbeat_at=now, attempts=WorkflowJob.attempts + 1)
+                .returning(WorkflowJob)
+                .execution_options(synchronize_session=False)
+            )
+            job = result.scalars().first()
+            await db.commit()
+            return job
+
+    async def _run(self, job: WorkflowJob):
+        logger.info(f"Running job {job.id} for document {job.document_id}")
+        task = asyncio.create_task(self.runner(job))
+        self._running[job.id] = task
+        result, error = None, None
+        try:
+            result = await task
+            status = "succeeded"
+        except asyncio.CancelledError:
+            status = "pending" if job.id in self._requeue else "cancelled"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            status, error = "failed", str(e)
+        finally:
+            self._running.pop(job.id, None)
+            self._requeue.discard(job.id)
+        values = {"status": status, "result": result, "error": error, "finished_at": None if status == "pending" else _now()}
+        if status == "pending":
+            values["attempts"] = WorkflowJob.attempts - 1  # Requeued at shutdown; the run did not fail
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(WorkflowJob).where(WorkflowJob.id == job.id).values(**values))
+            await db.commit()
+        logger.info(f"Job {job.id} {status}")
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.jobs_heartbeat_seconds)
+            try:
+                async with AsyncSessionLocal() as db:
+                    now = _now()
+                    if self._running:
+                        ids = list(self._running)
+                        await db.execute(update(WorkflowJob).where(WorkflowJob.id.in_(ids)).values(heartbeat_at=now))
+                        cancelled = await db.scalars(
+                            select(WorkflowJob.id).where(WorkflowJob.id.in_(ids), WorkflowJob.cancel_requested.is_(True))
+                        )
+                        for job_id in cancelled:
+                            task = self._running.get(job_id)
+                            if task is not None:
+                                task.cancel()
+                    # Requeue jobs whose worker stopped heartbeating, unless they keep killing their
+                    # worker (OOM, native crash): those fail after jobs_max_attempts claims
+                    stale = (
+                        WorkflowJob.status == "running",
+                        WorkflowJob.heartbeat_at < now - timedelta(seconds=settings.jobs_stale_after_seconds),
+                    )
+                    await db.execute(
+                        update(WorkflowJob)
+                        .where(*stale, WorkflowJob.attempts >= settings.jobs_max_attempts)
+                        .values(status="failed", finished_at=now, error=f"Worker stopped responding in {settings.jobs_max_attempts} attempts")
+                    )
+                    await db.execute(update(WorkflowJob).where(*stale).values(status="pending", started_at=None))
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+
+job_queue = JobQueue()
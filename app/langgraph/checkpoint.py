@@ -0,0 +1,235 @@
+import zlib
+from typing import Any, AsyncIterator, Optional, Sequence, Tuple
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple, WRITES_IDX_MAP
+from sqlalchemy import delete, event, select
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from app.config import settings
+from app.crud import dialect_insert
+from app.models import WorkflowCheckpoint, WorkflowCheckpointWrite
+
+checkpoints = WorkflowCheckpoint.__table__
+checkpoint_writes = WorkflowCheckpointWrite.__table__
+
+
+class SQLCheckpointStore:
+    """Checkpoint rows in SQL tables, keyed by (thread_id, checkpoint_ns, step).
+
+    Reading the latest checkpoint is one index lookup on the primary key; after each put,
+    steps older than the newest `keep` are deleted together with their pending writes.
+    """
+
+    def __init__(self, engine: AsyncEngine, keep: int, create_tables: bool = False):
+        self.engine = engine
+        self.keep = keep
+        self.create_tables = create_tables
+        self._ready = not create_tables
+
+    async def _setup(self):
+        if not self._ready:
+            async with self.engine.begin() as conn:
+                await conn.run_sync(
+                    lambda sync_conn: checkpoints.metadata.create_all(sync_conn, tables=[checkpoints, checkpoint_writes])
+                )
+            self._ready = True
+
+    async def get(self, thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str] = None):
+        await self._setup()
+        query = select(checkpoints).where(
+            checkpoints.c.thread_id == thread_id, checkpoints.c.checkpoint_ns == checkpoint_ns
+        )
+        if checkpoint_id:
+            query = query.where(checkpoints.c.checkpoint_id == checkpoint_id)
+        else:
+            query = query.order_by(checkpoints.c.step.desc()).limit(1)
+        async with self.engine.connect() as conn:
+            return (await conn.execute(query)).first()
+
+    async def list(self, thread_id: str, checkpoint_ns: Optional[str], before_step: Optional[int], limit: Optional[int]):
+        await self._setup()
+        query = select(checkpoints).where(checkpoints.c.thread_id == thread_id)
+        if checkpoint_ns is not None:
+            query = query.where(checkpoints.c.checkpoint_ns == checkpoint_ns)
+        if before_step is not None:
+            query = query.where(checkpoints.c.step < before_step)
+        query = query.order_by(checkpoints.c.step.desc()).limit(limit)
+        async with self.engine.connect() as conn:
+            return (await conn.execute(query)).all()
+
+    async def put(self, row: dict):
+        await self._setup()
+        async with self.engine.begin() as conn:
+            stmt = dialect_insert(conn.dialect.name, checkpoints).values(**row)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["thread_id", "checkpoint_ns", "step"],
+                set_={
+                    "checkpoint_id": stmt.excluded.checkpoint_id,
+                    "parent_checkpoint_id": stmt.excluded.parent_checkpoint_id,
+                    "checkpoint": stmt.excluded.checkpoint,
+                    "metadata": stmt.excluded.metadata,
+                },
+            )
+            await conn.execute(stmt)
+            # Prune: keep only the newest `keep` steps for this thread
+            cutoff = row["step"] - self.keep
+            scope = (
+                checkpoints.c.thread_id == row["thread_id"],
+                checkpoints.c.checkpoint_ns == row["checkpoint_ns"],
+                checkpoints.c.step <= cutoff,
+            )
+            await conn.execute(
+                delete(checkpoint_writes).where(
+                    checkpoint_writes.c.thread_id == row["thread_id"],
+                    checkpoint_writes.c.checkpoint_ns == row["checkpoint_ns"],
+                    checkpoint_writes.c.checkpoint_id.in_(select(checkpoints.c.checkpoint_id).where(*scope)),
+                )
+            )
+            await conn.execute(delete(checkpoints).where(*scope))
+
+    async def put_writes(self, rows: list, replace: bool = False):
+        # replace=True overwrites existing rows (special channels); otherwise the first write is kept
+        await self._setup()
+        if not rows:
+            return
+        async with self.engine.begin() as conn:
+            stmt = dialect_insert(conn.dialect.name, checkpoint_writes)
+            index_elements = ["thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"]
+            if replace:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=index_elements,
+                    set_={"channel": stmt.excluded.channel, "value": stmt.excluded.value},
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+            await conn.execute(stmt, rows)
+
+    async def get_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str):
+        await self._setup()
+        query = select(checkpoint_writes).where(
+            checkpoint_writes.c.thread_id == thread_id,
+            checkpoint_writes.c.checkpoint_ns == checkpoint_ns,
+            checkpoint_writes.c.checkpoint_id == checkpoint_id,
+        ).order_by(checkpoint_writes.c.task_id, checkpoint_writes.c.idx)
+        async with self.engine.connect() as conn:
+            return (await conn.execute(query)).all()
+
+    async def delete_thread(self, thread_id: str):
+        await self._setup()
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(checkpoint_writes).where(checkpoint_writes.c.thread_id == thread_id))
+            await conn.execute(delete(checkpoints).where(checkpoints.c.thread_id == thread_id))
+
+
+def local_sqlite_engine(path: str) -> AsyncEngine:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={settings.checkpoint_sqlite_mmap_bytes}")
+        cursor.close()
+
+    return engine
+
+
+class CompactCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer storing zlib-compressed, serde-encoded checkpoints in a SQLCheckpointStore."""
+
+    def __init__(self, store: SQLCheckpointStore, serde=None):
+        super().__init__(serde=serde)
+        self.store = store
+
+    def _pack(self, value: Any) -> bytes:
+        type_, data = self.serde.dumps_typed(value)
+        return zlib.compress(type_.encode() + b"\0" + data, settings.checkpoint_compression_level)
+
+    def _unpack(self, blob: bytes) -> Any:
+        type_, _, data = zlib.decompress(blob).partition(b"\0")
+        return self.serde.loads_typed((type_.decode(), data))
+
+    def _tuple(self, row, writes) -> CheckpointTuple:
+        configurable = {"thread_id": row.thread_id, "checkpoint_ns": row.checkpoint_ns}
+        return CheckpointTuple(
+            config={"configurable": {**configurable, "checkpoint_id": row.checkpoint_id}},
+            checkpoint=self._unpack(row.checkpoint),
+            metadata=self._unpack(row.metadata),
+            parent_config={"configurable": {**configurable, "checkpoint_id": row.parent_checkpoint_id}}
+            if row.parent_checkpoint_id else None,
+            pending_writes=[(w.task_id, w.channel, self._unpack(w.value)) for w in writes],
+        )
+
+    async def aget_tuple(self, config) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        row = await self.store.get(thread_id, checkpoint_ns, configurable.get("checkpoint_id"))
+        if row is None:
+            return None
+        writes = await self.store.get_writes(thread_id, checkpoint_ns, row.checkpoint_id)
+        return self._tuple(row, writes)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None) -> AsyncIterator[CheckpointTuple]:
+        if config is None:
+            raise ValueError("CompactCheckpointSaver.alist requires a thread_id in config")
+        configurable = config["configurable"]
+        before_step = None
+        if before is not None:
+            before_row = await self.store.get(
+                configurable["thread_id"], configurable.get("checkpoint_ns", ""), before["configurable"]["checkpoint_id"]
+            )
+            before_step = before_row.step if before_row is not None else None
+        rows = await self.store.list(configurable["thread_id"], configurable.get("checkpoint_ns"), before_step, limit)
+        for row in rows:
+            checkpoint_tuple = self._tuple(row, await self.store.get_writes(row.thread_id, row.checkpoint_ns, row.checkpoint_id))
+            if filter and any(checkpoint_tuple.metadata.get(key) != value for key, value in filter.items()):
+                continue
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        await self.store.put({
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "step": metadata.get("step", -1),
+            "checkpoint_id": checkpoint["id"],
+            "parent_checkpoint_id": configurable.get("checkpoint_id"),
+            "checkpoint": self._pack(checkpoint),
+            "metadata": self._pack(metadata),
+        })
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    async def aput_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        # Like LangGraph's own savers: writes to special channels (errors, interrupts) overwrite,
+        # regular writes are insert-if-absent so a retried task cannot change what was recorded
+        configurable = config["configurable"]
+        await self.store.put_writes([
+            {
+                "thread_id": configurable["thread_id"],
+                "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                "checkpoint_id": configurable["checkpoint_id"],
+                "task_id": task_id,
+                "idx": WRITES_IDX_MAP.get(channel, idx),
+                "channel": channel,
+                "value": self._pack(value),
+            }
+            for idx, (channel, value) in enumerate(writes)
+        ], replace=all(channel in WRITES_IDX_MAP for channel, _ in writes))
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.store.delete_thread(thread_id)
+
+
+def get_checkpointer() -> CompactCheckpointSaver:
+    # "database" shares the application's engine (tables come from the alembic migration);
+    # "sqlite" keeps checkpoints in a local file with WAL and mmap reads
+    if settings.checkpoint_backend == "database":
+        from app.database import engine
+        store = SQLCheckpointStore(engine, settings.checkpoint_keep)
+    elif settings.checkpoint_backend == "sqlite":
+        store = SQLCheckpointStore(local_sqlite_engine(settings.checkpoint_sqlite_path), settings.checkpoint_keep, create_tables=True)
+    else:
+        raise ValueError(f"Unsupported checkpoint_backend: {settings.checkpoint_backend}")
+    return CompactCheckpointSaver(store)
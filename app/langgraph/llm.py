@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Optional
+import httpx
+from openai import AsyncOpenAI
+from app.config import settings
+from app.metrics import observe_llm_call
+
+logger = logging.getLogger(__name__)
+
+# Shared async client for Ollama's OpenAI-compatible API. One pooled httpx client per process;
+# the SDK retries connection errors, 408/429 and 5xx with exponential backoff up to llm_max_retries.
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_llm_client() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            base_url=f"{settings.ollama_host}/v1",
+            api_key=settings.ollama_api_key,
+            timeout=settings.llm_timeout_seconds,
+            max_retries=settings.llm_max_retries,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_concurrency,
+                    max_keepalive_connections=settings.llm_max_concurrency,
+                ),
+                timeout=settings.llm_timeout_seconds,
+            ),
+        )
+    return _client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # Caps in-flight generations per process so a burst cannot swamp the model server
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+    return _semaphore
+
+
+async def chat_completion(prompt: str, temperature: float = 0.7, model: Optional[str] = None) -> str:
+    async with _get_semaphore():
+        started = time.perf_counter()
+        try:
+            response = await get_llm_client().chat.completions.create(
+                model=model or settings.ollama_model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+            )
+        except Exception:
+            observe_llm_call("complete", started, 0, outcome="error")
+            raise
+    observe_llm_call("complete", started, response.usage.completion_tokens if response.usage else 0)
+    return response.choices[0].message.content.strip()
+
+
+async def stream_chat_completion(prompt: str, temperature: float = 0.7, model: Optional[str] = None) -> AsyncIterator[str]:
+    # Yields content deltas as the model produces them; only the initial request is retried
+    async with _get_semaphore():
+        started = time.perf_counter()
+        tokens = usage_tokens = 0
+        outcome = "error"
+        try:
+            stream = await get_llm_client().chat.completions.create(
+                model=model or settings.ollama_model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    usage_tokens = chunk.usage.completion_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    tokens += 1  # Servers send about one token per chunk; exact usage wins when reported
+                    yield chunk.choices[0].delta.content
+            outcome = "ok"
+        finally:
+            observe_llm_call("stream", started, usage_tokens or tokens, outcome=outcome)
+
+
+async def close_llm_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
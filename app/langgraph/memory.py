@@ -0,0 +1,42 @@
+import asyncio
+import time
+import uuid
+from typing import Optional
+import numpy as np
+from app.config import settings
+from app.metrics import EMBEDDING_BATCH_SECONDS, EMBEDDING_BATCH_SIZE
+from app.langgraph.provider import provider
+from app.langgraph.vectorstore import create_store
+COLLECTION_NAME = "user_memory"
+store = create_store(provider, COLLECTION_NAME)
+def memory_point_id(user_id: int, msg: dict) -> str:
+    # Deterministic id per (user, turn) so turns that are already stored can be skipped
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"memory:{user_id}:{msg['user']}\x1f{msg['bot']}"))
+def embed_texts(texts: list) -> np.ndarray:
+    # One batched encode call; float32 rows are passed to the vector store as-is
+    started = time.perf_counter()
+    vectors = provider.embedder.encode(texts, batch_size=settings.embedding_batch_size, convert_to_numpy=True)
+    EMBEDDING_BATCH_SECONDS.observe(time.perf_counter() - started)
+    EMBEDDING_BATCH_SIZE.observe(len(texts))
+    return np.asarray(vectors, dtype=np.float32)
+async def save_memory(user_id: int, conversation_history: list):
+    loop = asyncio.get_running_loop()
+    turns = {memory_point_id(user_id, msg): msg for msg in conversation_history}
+    if not turns:
+        return
+    for point_id in await loop.run_in_executor(provider.executor, store.existing_ids, list(turns)):
+        turns.pop(point_id, None)
+    if not turns:
+        return
+    ids = list(turns)
+    vectors = await loop.run_in_executor(
+        provider.executor, embed_texts, [f"{msg['user']} {msg['bot']}" for msg in turns.values()]
+    )
+    payloads = [{"user_id": user_id, "user_message": msg["user"], "bot_message": msg["bot"]} for msg in turns.values()]
+    await loop.run_in_executor(provider.executor, store.upsert, user_id, ids, vectors, payloads)
+async def get_memory(user_id: int, query: str, k: Optional[int] = None):
+    # Top-k past turns for this user, ranked by similarity to query
+    loop = asyncio.get_running_loop()
+    vector = (await loop.run_in_executor(provider.executor, embed_texts, [query]))[0]
+    payloads = await loop.run_in_executor(provider.executor, store.search, user_id, vector, k or settings.memory_top_k)
+    return [{"user": payload["user_message"], "bot": payload["bot_message"]} for payload in payloads]
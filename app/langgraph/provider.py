@@ -0,0 +1,86 @@
+import asyncio
+import gc
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryProvider:
+    """Process-wide, lazily created embedding model and vector store client.
+
+    Nothing is loaded or connected at import time. The API lifespan calls start() once per
+    worker; run_server.py may call preload() in the parent process before forking so every
+    worker shares the model weights copy-on-write.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._embedder = None
+        self._client = None
+        self._collections = set()
+        # Embedding and blocking vector store calls run here, off the event loop thread
+        self.executor = ThreadPoolExecutor(max_workers=settings.embedding_workers, thread_name_prefix="memory")
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    from sentence_transformers import SentenceTransformer
+                    logger.info(f"Loading embedding model {settings.embedding_model}")
+                    self._embedder = SentenceTransformer(settings.embedding_model)
+        return self._embedder
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from qdrant_client import QdrantClient
+                    self._client = QdrantClient(host=settings.qdrant_host, port=settings.qdrant_port)
+        return self._client
+
+    def ensure_collection(self, name: str):
+        # Checked once per process; the first caller pays the round trip
+        if name in self._collections:
+            return
+        from qdrant_client.http.models import Distance, VectorParams
+        with self._lock:
+            if name in self._collections:
+                return
+            if not self.client.collection_exists(name):
+                self.client.create_collection(
+                    collection_name=name,
+                    vectors_config=VectorParams(size=settings.embedding_dim, distance=Distance.COSINE)
+                )
+            self._collections.add(name)
+
+    def warm_up(self):
+        # First encode pays for lazy weight init and kernel selection; keep it off the request path
+        self.embedder.encode(["warm up"], convert_to_numpy=True)
+
+    def preload(self):
+        """Load the model in a parent process before fork.
+
+        gc.freeze() moves everything allocated so far into the permanent generation so the
+        collector in each child does not write to (and so copy) those pages. No inference is
+        run here: thread pools started before fork do not survive into the children.
+        """
+        self.embedder
+        gc.freeze()
+
+    async def start(self):
+        if settings.memory_warm_up:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.warm_up)
+
+    async def stop(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._collections.clear()
+
+
+provider = MemoryProvider()
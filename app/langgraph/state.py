@@ -0,0 +1,19 @@
+from typing import TypedDict, Optional, List, Dict
+class QuizState(TypedDict):
+    session_id: str
+    user_id: int
+    document_id: int
+    document_text: Optional[str]
+    # Set by save_text: whether store_results must write document_text back to the document
+    text_changed: Optional[bool]
+    quiz_id: Optional[int]
+    question_id: Optional[int]
+    question: Optional[str]
+    correct_answer: Optional[str]
+    explanation: Optional[str]
+    # Batch generation: overrides for settings.quiz_num_questions / quiz_chunk_tokens and the results
+    num_questions: Optional[int]
+    chunk_tokens: Optional[int]
+    questions: Optional[List[Dict[str, str]]]
+    question_ids: Optional[List[int]]
+    conversation_history: List[Dict[str, str]]
\ No newline at end of file
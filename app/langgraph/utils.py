@@ -0,0 +1,477 @@
+import asyncio
+import hashlib
+import logging
+import json
+import os
+import re
+import tempfile
+from typing import Optional
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import StreamWriter
+from app.models import Document, DocumentContent, Quiz, Question
+from app.schemas import QuestionCreate
+from app.crud import bulk_insert
+from app.config import settings
+from app.cache import response_cache
+from app.metrics import GENERATION_CACHE_BYTES, GENERATION_CACHE_LOOKUPS, install_request_id_logging
+from app.uploads import content_hash, store_content_chunks
+from app.langgraph.llm import chat_completion, stream_chat_completion
+from app.langgraph.memory import get_memory
+
+# Configure logging; request_id ties workflow log lines to the API request that started them
+install_request_id_logging()
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s',
+    handlers=[
+        logging.FileHandler('quiz_generator.log'),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Prompt for single question generation
+QUESTION_PROMPT_TEMPLATE = """You are an expert educational content creator. Generate a high-quality question based on the document.
+
+RULES:
+- Generate ONE question
+- Test comprehension, not just memory
+- Focus on key concepts or facts
+- Provide the correct answer and a brief explanation
+- Return valid JSON
+
+{history}DOCUMENT TEXT:
+{document_text}
+
+OUTPUT FORMAT:
+{{
+    "question": "Your question here?",
+    "correct_answer": "The correct answer here",
+    "explanation": "Brief explanation of why this is correct"
+}}"""
+
+class GenerationCache:
+    """Disk cache of LLM generations keyed by a hash of content, model, prompt template and temperature.
+
+    Entries are JSON files; once the directory exceeds max_bytes the least recently used
+    files are evicted. Hits, misses and the cache size are exported to /metrics.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, enabled: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._total_bytes = None  # Scanned lazily on first write
+
+    @staticmethod
+    def make_key(content: str, model: str, template: str, temperature: float, **extra) -> str:
+        payload = json.dumps([content, model, template, temperature, extra], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)  # mtime doubles as last-access time for LRU eviction
+        return value
+
+    def _write(self, key: str, value) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value).encode()
+        # Unique per writer: executor threads of one process may write the same key at once
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self._total_bytes += len(data)
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+        GENERATION_CACHE_BYTES.set(self._total_bytes)
+
+    def _entries(self) -> list:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+        return entries
+
+    def _evict(self) -> None:
+        # Evict down to 90% of the bound so every write past the limit does not rescan
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._total_bytes = total
+
+    async def get(self, key: str):
+        if not self.enabled:
+            return None
+        value = await asyncio.to_thread(self._read, key)
+        GENERATION_CACHE_LOOKUPS.labels("miss" if value is None else "hit").inc()
+        return value
+
+    async def set(self, key: str, value) -> None:
+        if self.enabled:
+            await asyncio.to_thread(self._write, key, value)
+
+generation_cache = GenerationCache(
+    settings.generation_cache_dir,
+    settings.generation_cache_max_bytes,
+    enabled=settings.generation_cache_enabled,
+)
+
+def get_session(config: RunnableConfig) -> AsyncSession:
+    """Session shared by every node of a run, passed as config["configurable"]["db"].
+
+    save_document_text reads in a short transaction it commits before generation starts, so no
+    transaction (or row lock) is held across memory recall and the LLM calls. Every write happens
+    in store_quiz_results, which commits once, so a run is still atomic.
+    """
+    session = config.get("configurable", {}).get("db")
+    if session is None:
+        raise ValueError('Workflow config must provide an AsyncSession as configurable["db"]')
+    return session
+
+# Only the content column is read
+async def load_document_text(db: AsyncSession, document_id: int) -> str:
+    document_text = await db.scalar(select(DocumentContent.content).where(DocumentContent.document_id == document_id))
+    if not document_text:
+        logger.error(f"Document ID {document_id} has no content")
+        raise ValueError(f"Document ID {document_id} has no content")
+    return document_text
+
+# Top-k past turns of this user most similar to the document; the prompt asks the model not to repeat
+# them. They seed conversation_history, so conversation_task only stores the new turn.
+async def recall_history(state: dict, document_text: str) -> str:
+    if not settings.memory_top_k:
+        return ""
+    try:
+        turns = await get_memory(state["user_id"], document_text[:2000], settings.memory_top_k)
+    except Exception as e:
+        logger.warning(f"Memory recall failed, generating without history: {str(e)}")
+        return ""
+    state["conversation_history"] = turns + state.get("conversation_history", [])
+    if not turns:
+        return ""
+    lines = "\n".join(f"- {turn['bot']}" for turn in turns)
+    return f"PREVIOUSLY GENERATED FOR THIS USER (do not repeat these questions):\n{lines}\n\n"
+
+# Node 1: Put the document text in state; the new text is written by store_quiz_results
+async def save_document_text(state: dict, config: RunnableConfig) -> dict:
+    logger.info(f"Saving document text for session: {state['session_id']}")
+    try:
+        db = get_session(config)
+        document_id = state["document_id"]
+        document_text = state.get("document_text")
+        try:
+            if document_text is None:
+                # Jobs run against documents that are already stored
+                state["document_text"] = await load_document_text(db, document_id)
+                state["text_changed"] = False
+                logger.info(f"Loaded stored text for document ID: {document_id}")
+                return state
+
+            stored = (await db.execute(select(Document.content_hash).where(Document.id == document_id))).first()
+            if stored is None:
+                logger.error(f"Document ID {document_id} not found")
+                raise ValueError(f"Document ID {document_id} not found")
+            state["text_changed"] = stored.content_hash != content_hash(document_text)
+            logger.info(f"Document text for ID {document_id} {'changed' if state['text_changed'] else 'unchanged'}")
+            return state
+        finally:
+            # End the read transaction before generation
+            await db.commit()
+    
+    except Exception as e:
+        logger.error(f"Error in save_document_text: {str(e)}")
+        raise Exception(f"Failed to save document text: {str(e)}")
+
+# Node 2: Generate quiz question from document text
+async def generate_question(state: dict, config: RunnableConfig, writer: StreamWriter) -> dict:
+    logger.info(f"Generating question for session: {state['session_id']}")
+    try:
+        document_text = state["document_text"]
+        
+        # An unchanged document is served from the cache before memory is consulted: the recalled
+        # history changes with every run, so it is left out of the key
+        cache_key = GenerationCache.make_key(document_text, settings.ollama_model, QUESTION_PROMPT_TEMPLATE, 0.7)
+        cached = await generation_cache.get(cache_key)
+        if cached is not None:
+            state["question"] = cached["question"]
+            state["correct_answer"] = cached["correct_answer"]
+            state["explanation"] = cached["explanation"]
+            logger.info(f"Question served from generation cache: {cached['question']}")
+            writer({"event": "question", "index": 0, **cached})
+            return state
+
+        history = await recall_history(state, document_text)
+        prompt = QUESTION_PROMPT_TEMPLATE.format(history=history, document_text=document_text)
+        logger.info("Sending request to Ollama via OpenAI SDK")
+        try:
+            # Stream tokens to any listener (stream_mode="custom") while collecting the reply
+            parts = []
+            async for delta in stream_chat_completion(prompt, temperature=0.7):
+                parts.append(delta)
+                writer({"event": "token", "delta": delta})
+            result = json.loads("".join(parts).strip())
+            
+            # Validate response
+            required_fields = ["question", "correct_answer", "explanation"]
+            for field in required_fields:
+                if field not in result or not result[field]:
+                    logger.error(f"Missing or empty field: {field}")
+                    raise ValueError(f"Missing or empty field: {field}")
+            
+            state["question"] = result["question"]
+            state["correct_answer"] = result["correct_answer"]
+            state["explanation"] = result["explanation"]
+            question = {field: result[field] for field in required_fields}
+            await generation_cache.set(cache_key, question)
+            writer({"event": "question", "index": 0, **question})
+            logger.info(f"Question generated: {result['question']}")
+        
+        except Exception as e:
+            logger.error(f"Ollama request failed: {str(e)}")
+            raise Exception(f"Failed to generate question: {str(e)}")
+        
+        return state
+    
+    except Exception as e:
+        logger.error(f"Error in generate_question: {str(e)}")
+        raise Exception(f"Failed to generate question: {str(e)}")
+
+# Helpers for batch generation
+BATCH_PROMPT_TEMPLATE = """You are an expert educational content creator. Generate high-quality questions based on the document excerpt.
+
+RULES:
+- Generate exactly {count} distinct question(s)
+- Test comprehension, not just memory
+- Focus on key concepts or facts in this excerpt
+- Provide the correct answer and a brief explanation for each
+- Return valid JSON
+
+{history}DOCUMENT EXCERPT:
+{chunk}
+
+OUTPUT FORMAT:
+{{
+    "questions": [
+        {{
+            "question": "Your question here?",
+            "correct_answer": "The correct answer here",
+            "explanation": "Brief explanation of why this is correct"
+        }}
+    ]
+}}"""
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text; close enough for sizing prompts
+    return max(1, len(text) // 4)
+
+def chunk_text(text: str, chunk_tokens: int) -> list:
+    """Split text into chunks of at most ~chunk_tokens, preferring paragraph boundaries."""
+    chunks, current, current_tokens = [], [], 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = estimate_tokens(paragraph)
+        if tokens > chunk_tokens:
+            # Oversized paragraph: fall back to word windows
+            words = paragraph.split()
+            step = max(1, len(words) * chunk_tokens // tokens)
+            pieces = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        else:
+            pieces = [paragraph]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > chunk_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def plan_chunks(chunks: list, num_questions: int) -> list:
+    """Spread num_questions over the chunks; returns (chunk, count) pairs."""
+    if len(chunks) > num_questions:
+        # More chunks than questions: sample evenly across the document
+        stride = len(chunks) / num_questions
+        chunks = [chunks[int(i * stride)] for i in range(num_questions)]
+    base, extra = divmod(num_questions, len(chunks))
+    return [(chunk, base + (1 if i < extra else 0)) for i, chunk in enumerate(chunks)]
+
+def parse_llm_json(content: str) -> dict:
+    # Models sometimes wrap JSON in prose or code fences
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("No JSON object in model output")
+    return json.loads(content[start:end + 1])
+
+def _normalize_question(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+def dedupe_questions(questions: list, threshold: float = 0.8) -> list:
+    """Drop exact (normalized) duplicates and near duplicates by word-set Jaccard similarity."""
+    kept, kept_words = [], []
+    for item in questions:
+        words = set(_normalize_question(item["question"]).split())
+        if any(len(words & other) / max(1, len(words | other)) >= threshold for other in kept_words):
+            continue
+        kept.append(item)
+        kept_words.append(words)
+    return kept
+
+def _chunk_cache_key(chunk: str, count: int) -> str:
+    return GenerationCache.make_key(chunk, settings.ollama_model, BATCH_PROMPT_TEMPLATE, 0.7, count=count)
+
+async def _generate_for_chunk(chunk: str, count: int, history: str = "", cached: Optional[list] = None) -> list:
+    if cached is not None:
+        return cached
+    cache_key = _chunk_cache_key(chunk, count)
+    content = await chat_completion(BATCH_PROMPT_TEMPLATE.format(count=count, history=history, chunk=chunk), temperature=0.7)
+    result = parse_llm_json(content)
+    valid = []
+    for item in result.get("questions", []):
+        if all(item.get(field) for field in ("question", "correct_answer", "explanation")):
+            valid.append({field: item[field] for field in ("question", "correct_answer", "explanation")})
+    if valid:
+        await generation_cache.set(cache_key, valid)
+    return valid
+
+# Node 2b: Generate many questions from document text in one pass (batch mode)
+async def generate_questions(state: dict, config: RunnableConfig, writer: StreamWriter) -> dict:
+    logger.info(f"Generating questions in batch for session: {state['session_id']}")
+    try:
+        document_id = state["document_id"]
+        num_questions = state.get("num_questions") or settings.quiz_num_questions
+        chunk_tokens = state.get("chunk_tokens") or settings.quiz_chunk_tokens
+
+        document_text = state["document_text"]
+        chunks = chunk_text(document_text, chunk_tokens)
+        if not chunks:
+            raise ValueError(f"Document ID {document_id} has no text")
+        plan = plan_chunks(chunks, num_questions)
+        # Cached chunks skip the model; memory is recalled only when some chunk still needs a prompt
+        cached = await asyncio.gather(*(generation_cache.get(_chunk_cache_key(chunk, count)) for chunk, count in plan))
+        history = "" if all(hit is not None for hit in cached) else await recall_history(state, document_text)
+        logger.info(f"Sending {sum(hit is None for hit in cached)} of {len(plan)} chunk prompts to Ollama for {num_questions} questions")
+
+        # Chunk prompts run concurrently; chat_completion caps the in-flight requests.
+        # Questions are deduplicated and streamed in the order their chunks finish.
+        tasks = [
+            asyncio.ensure_future(_generate_for_chunk(chunk, count, history, hit))
+            for (chunk, count), hit in zip(plan, cached)
+        ]
+        questions, generated = [], 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                try:
+                    result = await next_result
+                except Exception as e:
+                    logger.error(f"Chunk generation failed: {str(e)}")
+                    continue
+                generated += len(result)
+                kept = dedupe_questions(questions + result)[:num_questions]
+                for index in range(len(questions), len(kept)):
+                    writer({"event": "question", "index": index, **kept[index]})
+                questions = kept
+                if len(questions) >= num_questions:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+        if not questions:
+            raise ValueError("No valid questions generated")
+
+        state["questions"] = questions
+        state["question"] = questions[0]["question"]
+        state["correct_answer"] = questions[0]["correct_answer"]
+        state["explanation"] = questions[0]["explanation"]
+        logger.info(f"Generated {len(questions)} questions ({generated - len(questions)} duplicates or extras dropped)")
+        return state
+
+    except Exception as e:
+        logger.error(f"Error in generate_questions: {str(e)}")
+        raise Exception(f"Failed to generate questions: {str(e)}")
+
+# Node 3: Store quiz results in PostgreSQL
+async def store_quiz_results(state: dict, config: RunnableConfig, writer: StreamWriter) -> dict:
+    logger.info(f"Storing quiz results for session: {state['session_id']}")
+    try:
+        db = get_session(config)
+        user_id = state["user_id"]
+        document_id = state["document_id"]
+        
+        # Batch mode fills state["questions"]; single mode only sets the question fields
+        questions = state.get("questions") or [{
+            "question": state["question"],
+            "correct_answer": state["correct_answer"],
+            "explanation": state["explanation"],
+        }]
+        
+        if state.get("text_changed"):
+            db_document = await db.get(Document, document_id, options=[selectinload(Document.body)])
+            if not db_document:
+                raise ValueError(f"Document ID {document_id} not found")
+            db_document.content = state["document_text"]
+            db_document.content_hash = content_hash(state["document_text"])
+            await store_content_chunks(db, {document_id: state["document_text"]}, replace=True)
+
+        # Quiz and questions go out as two INSERT ... RETURNING statements (the document update
+        # is autoflushed ahead of them) and the whole run commits once
+        quiz_title = f"Quiz for Document {document_id}"
+        quiz_id = await db.scalar(insert(Quiz).values(title=quiz_title, owner_id=user_id).returning(Quiz.id))
+        
+        rows = [
+            QuestionCreate(
+                text=item["question"],
+                correct_answer=item["correct_answer"],
+                explanation=item["explanation"],
+                quiz_id=quiz_id
+            ).model_dump()
+            for item in questions
+        ]
+        question_ids = await bulk_insert(db, Question, rows)
+        await db.commit()
+        await response_cache.invalidate("document", document_id)
+        await response_cache.invalidate("user", user_id)
+        
+        state["quiz_id"] = quiz_id
+        state["question_id"] = question_ids[0]
+        state["question_ids"] = question_ids
+        writer({"event": "quiz", "quiz_id": quiz_id, "question_ids": question_ids})
+        logger.info(f"Quiz ID {quiz_id} and {len(question_ids)} question(s) stored")
+        return state
+    
+    except Exception as e:
+        logger.error(f"Error in store_quiz_results: {str(e)}")
+        raise Exception(f"Failed to store quiz results: {str(e)}")
\ No newline at end of file
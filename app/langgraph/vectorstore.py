@@ -0,0 +1,115 @@
+import threading
+from typing import Dict, List
+import numpy as np
+from app.config import settings
+
+
+class VectorStore:
+    """Per-user memory vectors: upsert by id and top-k nearest-neighbour search filtered by user."""
+
+    def existing_ids(self, ids: List[str]) -> set:
+        raise NotImplementedError
+
+    def upsert(self, user_id: int, ids: List[str], vectors: np.ndarray, payloads: List[dict]) -> None:
+        raise NotImplementedError
+
+    def search(self, user_id: int, vector: np.ndarray, k: int) -> List[dict]:
+        raise NotImplementedError
+
+    def ping(self) -> None:
+        """Raise if the backend cannot be reached (readiness checks)."""
+
+
+class QdrantStore(VectorStore):
+    def __init__(self, provider, collection_name: str):
+        self.provider = provider
+        self.collection_name = collection_name
+        self._indexed = False
+
+    @property
+    def client(self):
+        self.provider.ensure_collection(self.collection_name)
+        if not self._indexed:
+            # Payload index keeps the user_id filter cheap as the collection grows
+            from qdrant_client.http.models import PayloadSchemaType
+            self.provider.client.create_payload_index(
+                self.collection_name, field_name="user_id", field_schema=PayloadSchemaType.INTEGER
+            )
+            self._indexed = True
+        return self.provider.client
+
+    def ping(self) -> None:
+        self.provider.client.get_collections()
+
+    def existing_ids(self, ids: List[str]) -> set:
+        points = self.client.retrieve(self.collection_name, ids=ids, with_payload=False, with_vectors=False)
+        return {str(point.id) for point in points}
+
+    def upsert(self, user_id: int, ids: List[str], vectors: np.ndarray, payloads: List[dict]) -> None:
+        self.client.upload_collection(
+            collection_name=self.collection_name, vectors=vectors, payload=payloads, ids=ids, wait=True
+        )
+
+    def search(self, user_id: int, vector: np.ndarray, k: int) -> List[dict]:
+        from qdrant_client.http.models import FieldCondition, Filter, MatchValue
+        result = self.client.query_points(
+            self.collection_name,
+            query=vector,
+            query_filter=Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))]),
+            limit=k,
+            with_payload=True,
+        )
+        return [point.payload for point in result.points]
+
+
+class NumpyStore(VectorStore):
+    """In-process brute-force backend for tests and small deployments.
+
+    Vectors are kept L2-normalized in one float32 matrix per user, so cosine search is a
+    single matrix-vector product plus argpartition.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}  # point id -> owning user
+        self._users: Dict[int, dict] = {}
+
+    def existing_ids(self, ids: List[str]) -> set:
+        with self._lock:
+            return {point_id for point_id in ids if point_id in self._ids}
+
+    def upsert(self, user_id: int, ids: List[str], vectors: np.ndarray, payloads: List[dict]) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        with self._lock:
+            new = [i for i, point_id in enumerate(ids) if point_id not in self._ids]
+            if not new:
+                return
+            user = self._users.setdefault(
+                user_id, {"matrix": np.empty((0, vectors.shape[1]), dtype=np.float32), "payloads": []}
+            )
+            user["matrix"] = np.vstack([user["matrix"], vectors[new]])
+            user["payloads"].extend(payloads[i] for i in new)
+            for i in new:
+                self._ids[ids[i]] = user_id
+
+    def search(self, user_id: int, vector: np.ndarray, k: int) -> List[dict]:
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None or k <= 0:
+                return []
+            matrix, payloads = user["matrix"], user["payloads"]
+        vector = np.asarray(vector, dtype=np.float32)
+        scores = matrix @ (vector / (np.linalg.norm(vector) or 1))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [payloads[i] for i in top[np.argsort(-scores[top])]]
+
+
+def create_store(provider, collection_name: str) -> VectorStore:
+    if settings.memory_backend == "numpy":
+        return NumpyStore()
+    if settings.memory_backend == "qdrant":
+        return QdrantStore(provider, collection_name)
+    raise ValueError(f"Unsupported memory_backend: {settings.memory_backend}")
@@ -1,24 +1,22 @@
 from langgraph.graph import StateGraph, END
 from app.langgraph.state import QuizState
-from app.langgraph.memory import save_memory, get_memory
-from app.langgraph.checkpoint import QdrantCheckpoint
-from app.langgraph.utils import save_document_text, generate_question, store_quiz_results
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
-from fastapi import Depends
+from app.langgraph.memory import save_memory
+from app.langgraph.checkpoint import get_checkpointer
+from app.langgraph.utils import save_document_text, generate_question, generate_questions, store_quiz_results
 import logging
 logger = logging.getLogger(__name__)
-async def conversation_task(state: QuizState, db: AsyncSession = Depends(get_db)) -> QuizState:
+async def conversation_task(state: QuizState) -> QuizState:
     logger.info(f"Saving conversation for session {state['session_id']}")
     state["conversation_history"].append(
         {"user": f"Requested quiz for document {state['document_id']}", "bot": f"Generated question: {state['question']}"}
     )
     await save_memory(state["user_id"], state["conversation_history"])
     return state
-def build_workflow():
+def build_workflow(batch: bool = False):
+    # batch=True generates settings.quiz_num_questions (or state["num_questions"]) questions per run
     workflow = StateGraph(QuizState)
     workflow.add_node("save_text", save_document_text)
-    workflow.add_node("generate_question", generate_question)
+    workflow.add_node("generate_question", generate_questions if batch else generate_question)
     workflow.add_node("conversation", conversation_task)
     workflow.add_node("store_results", store_quiz_results)
     workflow.set_entry_point("save_text")
@@ -26,4 +24,4 @@ def build_workflow():
     workflow.add_edge("generate_question", "conversation")
     workflow.add_edge("conversation", "store_results")
     workflow.add_edge("store_results", END)
-    return workflow.compile(checkpointer=QdrantCheckpoint())
\ No newline at end of file
+    return workflow.compile(checkpointer=get_checkpointer())
\ No newline at end of file
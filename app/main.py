@@ -1,13 +1,53 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+import orjson
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import func, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
 from .config import settings
-from .database import engine, Base, get_db
-from .models import User, Document, Quiz, Question
-from .schemas import UserCreate, User, DocumentCreate, Document, QuizCreate, Quiz, QuestionCreate, Question
-from pydantic import BaseModel
+from .database import engine, read_engine, Base, AsyncSessionLocal, AsyncReadSessionLocal, check_schema, get_db, get_read_db, ping, warm_pool
+from . import models, schemas
+from .cache import cache_key, etag_response, response_cache
+from .jobs import FINISHED, PRIORITIES, QueueFull, job_queue, one_off_thread, quiz_graph, quiz_state
+from .compression import CompressionMiddleware
+from .crud import bulk_insert, bulk_insert_new, dialect_insert, existing_ids, get_many, keyset_page
+from .idempotency import IdempotencyMiddleware
+from .ratelimit import Overloaded, admission, rate_limiter
+from .metrics import MetricsMiddleware, install_request_id_logging, instrument_engine, metrics_response
+from .search import search_query
+from .uploads import DocumentUpload, UploadTooLarge, content_hash, store_content_chunks, unpack
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.schema_check == "alembic":
+        await check_schema(engine)
+    elif settings.schema_check == "create_all":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    await warm_pool(engine, settings.db_pool_warm_connections)
+    if read_engine is not engine:
+        await warm_pool(read_engine, settings.db_pool_warm_connections)
+    # The embedding model and vector store client are created once per worker, here, not at import
+    if settings.memory_enabled:
+        from app.langgraph.provider import provider
+        await provider.start()
+    if settings.jobs_enabled:
+        await job_queue.start()
+    yield
+    if settings.jobs_enabled:
+        await job_queue.stop(settings.jobs_drain_timeout_seconds)
+    if settings.memory_enabled:
+        from app.langgraph.llm import close_llm_client
+        await provider.stop()
+        await close_llm_client()
 
 app = FastAPI(
     title=settings.app_name,
@@ -15,7 +55,9 @@ app = FastAPI(
     version=settings.app_version,
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -26,15 +68,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def startup_event():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+if settings.idempotency_enabled:
+    app.add_middleware(IdempotencyMiddleware)
+
+if settings.compression_enabled:
+    # Outside idempotency, so stored responses stay uncompressed and replays follow the retry's Accept-Encoding
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_bytes)
 
-class HealthResponse(BaseModel):
-    status: str
-    message: str
-    version: str
+install_request_id_logging()
+if settings.metrics_enabled:
+    # Added last so it wraps everything else, CORS included
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "primary")
+    if read_engine is not engine:
+        instrument_engine(read_engine, "replica")
 
 @app.get("/", include_in_schema=False)
 async def root():
@@ -48,84 +95,613 @@ async def get_app_info():
         "description": settings.app_description,
         "documentation": "/docs",
         "alternative_docs": "/redoc",
-        "health_check": f"{settings.api_v1_prefix}/health"
+        "health_check": "/health"
     }
 
-@app.get("/health", tags=["Health Check"], response_model=HealthResponse)
-async def health_check():
-    return HealthResponse(
-        status="healthy",
-        message="API is running perfectly!",
-        version=settings.app_version
+# Liveness: the process serves requests. Readiness (also served at /health): its dependencies answer too.
+@app.get("/health/live", tags=["Health Check"])
+async def liveness():
+    return {"status": "alive"}
+
+async def _check(name: str, probe) -> tuple:
+    try:
+        await asyncio.wait_for(probe(), timeout=settings.health_check_timeout_seconds)
+        return name, "ok"
+    except asyncio.TimeoutError:
+        return name, "timeout"
+    except Exception as e:
+        return name, f"error: {e}"
+
+async def _ping_vector_store():
+    from app.langgraph.memory import store
+    from app.langgraph.provider import provider
+    await asyncio.get_running_loop().run_in_executor(provider.executor, store.ping)
+
+@app.get("/health", tags=["Health Check"])
+@app.get("/health/ready", tags=["Health Check"])
+async def readiness():
+    probes = [("database", lambda: ping(engine))]
+    if read_engine is not engine:
+        probes.append(("database_replica", lambda: ping(read_engine)))
+    if settings.memory_enabled:
+        probes.append(("vector_store", _ping_vector_store))
+    checks = dict(await asyncio.gather(*(_check(name, probe) for name, probe in probes)))
+    ready = all(result == "ok" for result in checks.values())
+    return ORJSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "unavailable", "checks": checks},
     )
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return metrics_response()
+
+# Helpers for batch endpoints
+def _check_batch_size(count: int):
+    if count > settings.max_batch_size:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds limit of {settings.max_batch_size}")
+
+async def _insert_batch(db: AsyncSession, model, rows: dict, errors: dict, total: int, invalidate=None, unique=None, detached=None, on_detached=None) -> schemas.BatchResult:
+    # rows and errors are keyed by the item's index in the request; all valid rows go in one transaction.
+    # invalidate=(entity, field) drops cached parents referenced by the inserted rows.
+    # unique=(column, error) skips rows whose value already exists (ON CONFLICT) and reports them as error.
+    # detached=(model, field, key) stores each row's field in a separate table, keyed by the new id;
+    # on_detached(db, {id: value}) then runs in the same transaction.
+    indexes = sorted(rows)
+    if detached:
+        detached_model, field, key = detached
+        values = {i: rows[i].pop(field) for i in indexes}
+    if unique is None:
+        ids = await bulk_insert(db, model, [rows[i] for i in indexes])
+    else:
+        column, error = unique
+        ids = await bulk_insert_new(db, model, [rows[i] for i in indexes], column)
+        errors.update((i, error) for i, id in zip(indexes, ids) if id is None)
+    created = {i: id for i, id in zip(indexes, ids) if id is not None}
+    if detached and created:
+        await db.execute(insert(detached_model), [{key: id, field: values[i]} for i, id in created.items()])
+        if on_detached:
+            await on_detached(db, {id: values[i] for i, id in created.items()})
+    await db.commit()
+    if invalidate:
+        entity, field = invalidate
+        await response_cache.invalidate(entity, *(rows[i][field] for i in created))
+    results = [
+        schemas.BatchItemResult(index=i, success=True, id=created[i]) if i in created
+        else schemas.BatchItemResult(index=i, success=False, error=errors[i])
+        for i in range(total)
+    ]
+    return schemas.BatchResult(created=len(created), failed=len(errors), results=results)
+
+async def _insert_owned_batch(db: AsyncSession, model, items: list, detached=None, on_detached=None, derived=None) -> schemas.BatchResult:
+    # Documents and quizzes must reference an existing owner; derived(item) adds computed columns to its row
+    _check_batch_size(len(items))
+    owners = await existing_ids(db, models.User, (item.owner_id for item in items))
+    rows, errors = {}, {}
+    for i, item in enumerate(items):
+        if item.owner_id in owners:
+            rows[i] = item.model_dump()
+            if derived:
+                rows[i].update(derived(item))
+        else:
+            errors[i] = f"User {item.owner_id} not found"
+    return await _insert_batch(db, model, rows, errors, len(items), invalidate=("user", "owner_id"), detached=detached, on_detached=on_detached)
+
+# Helpers for list endpoints and ?expand= (relationships must be eager-loaded under AsyncSession)
+def _parse_expand(expand: Optional[str], allowed: set, param: str = "expand") -> set:
+    fields = {field.strip() for field in expand.split(",") if field.strip()} if expand else set()
+    unknown = fields - allowed
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {param} field(s): {', '.join(sorted(unknown))}")
+    return fields
+
+# ?fields= on document reads selects only the named columns; document_contents is joined only for
+# content. The id is always selected (pagination and ordering need it) and dropped from the output
+# unless requested. Returns the query and the fields to include in the response.
+DOCUMENT_COLUMNS = {
+    "id": models.Document.id,
+    "title": models.Document.title,
+    "content": models.DocumentContent.content,
+    "owner_id": models.Document.owner_id,
+}
+
+def _document_query(fields: Optional[str]) -> tuple:
+    names = _parse_expand(fields, schemas.DOCUMENT_FIELDS, "document") or schemas.DOCUMENT_FIELDS
+    query = select(*(column for name, column in DOCUMENT_COLUMNS.items() if name in names or name == "id"))
+    if "content" in names:
+        query = query.join_from(models.Document, models.DocumentContent)
+    return query, names
+
+def _user_load_options(expand: set) -> list:
+    options = []
+    if "quizzes.questions" in expand:
+        options.append(selectinload(models.User.quizzes).selectinload(models.Quiz.questions))
+    elif "quizzes" in expand:
+        options.append(selectinload(models.User.quizzes))
+    if "documents" in expand:
+        options.append(selectinload(models.User.documents).selectinload(models.Document.body))
+    return options
+
+# Only loaded relationships are referenced; the ORM rows themselves are validated by schemas.dump_json
+def _quiz_detail(db_quiz, expand: set) -> dict:
+    detail = {"id": db_quiz.id, "title": db_quiz.title, "owner_id": db_quiz.owner_id}
+    if "questions" in expand:
+        detail["questions"] = db_quiz.questions
+    return detail
+
+def _user_detail(db_user, expand: set) -> dict:
+    detail = {"id": db_user.id, "name": db_user.name, "email": db_user.email}
+    if expand & {"quizzes", "quizzes.questions"}:
+        quiz_expand = {"questions"} if "quizzes.questions" in expand else set()
+        detail["quizzes"] = [_quiz_detail(q, quiz_expand) for q in db_user.quizzes]
+    if "documents" in expand:
+        detail["documents"] = db_user.documents
+    return detail
+
+def _json(tp, value, exclude_none: bool = False, include=None) -> Response:
+    return Response(content=schemas.dump_json(tp, value, exclude_none, include), media_type="application/json")
+
 # CRUD for User
-@app.post(f"{settings.api_v1_prefix}/users/", response_model=User, tags=["Users"])
-async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).filter(User.email == user.email))
-    if result.scalars().first():
+# One INSERT ... ON CONFLICT on the unique email index, so concurrent requests cannot both pass a
+# check and then fail. upsert=true updates the name of an existing user and returns it instead of 400.
+@app.post(f"{settings.api_v1_prefix}/users/", response_model=schemas.User, tags=["Users"])
+async def create_user(user: schemas.UserCreate, upsert: bool = False, db: AsyncSession = Depends(get_db)):
+    stmt = dialect_insert(db.bind.dialect.name, models.User.__table__).values(name=user.name, email=user.email)
+    if upsert:
+        stmt = stmt.on_conflict_do_update(index_elements=[models.User.email], set_={"name": stmt.excluded.name})
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[models.User.email])
+    row = (await db.execute(stmt.returning(models.User.id, models.User.name, models.User.email))).first()
+    if row is None:
         raise HTTPException(status_code=400, detail="Email already registered")
-    db_user = User(name=user.name, email=user.email)
-    db.add(db_user)
     await db.commit()
-    await db.refresh(db_user)
-    return db_user
-
-@app.get(f"{settings.api_v1_prefix}/users/{{user_id}}", response_model=User, tags=["Users"])
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).filter(User.id == user_id))
-    db_user = result.scalars().first()
-    if db_user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    return db_user
+    if upsert:
+        await response_cache.invalidate("user", row.id)
+    return row
+
+# Cached single-entity reads fill the cache from the primary: a lagging replica could put a row
+# back right after its invalidation. Cache hits never check out a connection.
+@app.get(f"{settings.api_v1_prefix}/users/{{user_id}}", response_model=schemas.UserDetail, response_model_exclude_none=True, tags=["Users"])
+async def get_user(request: Request, user_id: int, expand: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    fields = _parse_expand(expand, schemas.USER_EXPANSIONS)
+    key = cache_key("user", user_id, fields)
+    entry = await response_cache.get(key)
+    if entry is None:
+        query = select(models.User).filter(models.User.id == user_id).options(*_user_load_options(fields))
+        result = await db.execute(query)
+        db_user = result.scalars().first()
+        if db_user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        body = schemas.dump_json(schemas.UserDetail, _user_detail(db_user, fields), exclude_none=True)
+        entry = await response_cache.set(key, body)
+    return etag_response(request, entry)
+
+@app.get(f"{settings.api_v1_prefix}/users/{{user_id}}/quizzes", response_model=schemas.Page[schemas.QuizDetail], response_model_exclude_none=True, tags=["Users"])
+async def list_user_quizzes(
+    user_id: int,
+    after: Optional[int] = None,
+    limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+    expand: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    fields = _parse_expand(expand, schemas.QUIZ_EXPANSIONS)
+    query = select(models.Quiz).filter(models.Quiz.owner_id == user_id)
+    if "questions" in fields:
+        query = query.options(selectinload(models.Quiz.questions))
+    quizzes, next_cursor = await keyset_page(db, query, models.Quiz, after, limit)
+    return _json(schemas.Page[schemas.QuizDetail], {"items": [_quiz_detail(q, fields) for q in quizzes], "next_cursor": next_cursor}, exclude_none=True)
+
+@app.get(f"{settings.api_v1_prefix}/users/{{user_id}}/documents", response_model=schemas.Page[schemas.Document], tags=["Users"])
+async def list_user_documents(
+    user_id: int,
+    after: Optional[int] = None,
+    limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    query, names = _document_query(fields)
+    documents, next_cursor = await keyset_page(db, query.filter(models.Document.owner_id == user_id), models.Document, after, limit)
+    return _json(
+        schemas.Page[schemas.DocumentFields],
+        {"items": documents, "next_cursor": next_cursor},
+        include={"items": {"__all__": names}, "next_cursor": True},
+    )
+
+@app.post(f"{settings.api_v1_prefix}/users/batch", response_model=schemas.BatchResult, tags=["Users"])
+async def create_users(users: List[schemas.UserCreate], db: AsyncSession = Depends(get_db)):
+    _check_batch_size(len(users))
+    seen = set()
+    rows, errors = {}, {}
+    for i, user in enumerate(users):
+        if user.email in seen:
+            errors[i] = "Duplicate email in batch"
+        else:
+            seen.add(user.email)
+            rows[i] = user.model_dump()
+    return await _insert_batch(db, models.User, rows, errors, len(users), unique=(models.User.email, "Email already registered"))
+
+@app.get(f"{settings.api_v1_prefix}/users", response_model=List[schemas.User], tags=["Users"])
+async def get_users(ids: List[int] = Query(...), db: AsyncSession = Depends(get_read_db)):
+    _check_batch_size(len(ids))
+    return _json(List[schemas.User], await get_many(db, models.User, ids))
 
 # CRUD for Document
-@app.post(f"{settings.api_v1_prefix}/documents/", response_model=Document, tags=["Documents"])
-async def create_document(document: DocumentCreate, db: AsyncSession = Depends(get_db)):
-    db_document = Document(title=document.title, content=document.content, owner_id=document.owner_id)
+@app.post(f"{settings.api_v1_prefix}/documents/", response_model=schemas.Document, tags=["Documents"])
+async def create_document(document: schemas.DocumentCreate, db: AsyncSession = Depends(get_db)):
+    db_document = models.Document(
+        title=document.title,
+        content=document.content,
+        content_hash=content_hash(document.content),
+        owner_id=document.owner_id,
+    )
     db.add(db_document)
+    await db.flush()
+    await store_content_chunks(db, {db_document.id: document.content})
     await db.commit()
-    await db.refresh(db_document)
+    await response_cache.invalidate("user", document.owner_id)
     return db_document
 
-@app.get(f"{settings.api_v1_prefix}/documents/{{document_id}}", response_model=Document, tags=["Documents"])
-async def get_document(document_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Document).filter(Document.id == document_id))
-    db_document = result.scalars().first()
-    if db_document is None:
+@app.get(f"{settings.api_v1_prefix}/documents/{{document_id}}", response_model=schemas.Document, tags=["Documents"])
+async def get_document(request: Request, document_id: int, fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    query, names = _document_query(fields)
+    key = cache_key("document", document_id) if fields is None else None
+    entry = await response_cache.get(key)
+    if entry is None:
+        db_document = (await db.execute(query.filter(models.Document.id == document_id))).first()
+        if db_document is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        body = schemas.dump_json(schemas.DocumentFields, db_document, include=names)
+        entry = await response_cache.set(key, body)
+    return etag_response(request, entry)
+
+# Streaming multipart upload: form fields title and owner_id plus one text file part
+@app.post(f"{settings.api_v1_prefix}/documents/upload", response_model=schemas.DocumentUploadResult, status_code=201, tags=["Documents"])
+async def upload_document(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=415, detail="Expected multipart/form-data with a boundary")
+    upload = DocumentUpload(db)
+    parser = MultipartParser(options[b"boundary"], callbacks=upload.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            await upload.flush()
+        parser.finalize()
+        title, owner_id = upload.validate()
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {settings.upload_max_bytes} bytes")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if await db.get(models.User, owner_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    document_id, title, duplicate = await upload.finish(title, owner_id)
+    if duplicate:
+        response.status_code = 200
+    else:
+        await response_cache.invalidate("user", owner_id)
+    return schemas.DocumentUploadResult(
+        id=document_id, title=title, owner_id=owner_id, content_hash=upload.content_hash, size=upload.size, duplicate=duplicate,
+    )
+
+def _byte_range(header: Optional[str], size: int):
+    # Single "bytes=" range -> (start, end) inclusive; None serves the whole body (RFC 9110 allows ignoring the header)
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else None
+        else:
+            start, end = max(0, size - int(last)), None
+    except ValueError:
+        return None
+    if end is None:
+        end = size - 1
+    elif end < start:
+        return None  # Syntactically invalid: ignored like any other malformed Range
+    if start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+@app.get(f"{settings.api_v1_prefix}/documents/{{document_id}}/content", tags=["Documents"])
+async def get_document_content(request: Request, document_id: int):
+    # Raw UTF-8 content with Range support, streamed from the compressed slices the range overlaps
+    chunk = models.DocumentContentChunk
+    async with AsyncReadSessionLocal() as db:
+        row = (await db.execute(
+            select(models.Document.content_hash, func.coalesce(func.sum(chunk.size), 0))
+            .join_from(models.Document, chunk, isouter=True)
+            .filter(models.Document.id == document_id)
+            .group_by(models.Document.id)
+        )).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Document not found")
-    return db_document
+    digest, size = row
+    headers = {"Accept-Ranges": "bytes"}
+    if digest:
+        headers["ETag"] = f'"{digest}"'
+    byte_range = _byte_range(request.headers.get("range"), size)
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1 if size else 0)
+
+    async def body():
+        if not size:
+            return
+        async with AsyncReadSessionLocal() as db:
+            offsets = (await db.scalars(
+                select(chunk.byte_offset)
+                .filter(chunk.document_id == document_id, chunk.byte_offset <= end, chunk.byte_offset + chunk.size > start)
+                .order_by(chunk.byte_offset)
+            )).all()
+        for offset in offsets:
+            # One short read per slice: no connection stays checked out while a slow client drains the body
+            async with AsyncReadSessionLocal() as db:
+                data = unpack(await db.scalar(
+                    select(chunk.data).filter(chunk.document_id == document_id, chunk.byte_offset == offset)
+                ))
+            yield data[max(0, start - offset):end + 1 - offset]
+
+    if byte_range is None:
+        return StreamingResponse(body(), media_type="text/plain; charset=utf-8", headers=headers)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(body(), status_code=206, media_type="text/plain; charset=utf-8", headers=headers)
+
+@app.post(f"{settings.api_v1_prefix}/documents/batch", response_model=schemas.BatchResult, tags=["Documents"])
+async def create_documents(documents: List[schemas.DocumentCreate], db: AsyncSession = Depends(get_db)):
+    return await _insert_owned_batch(
+        db, models.Document, documents,
+        detached=(models.DocumentContent, "content", "document_id"),
+        on_detached=store_content_chunks,
+        derived=lambda document: {"content_hash": content_hash(document.content)},
+    )
+
+@app.get(f"{settings.api_v1_prefix}/documents", response_model=List[schemas.Document], tags=["Documents"])
+async def get_documents(ids: List[int] = Query(...), fields: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    _check_batch_size(len(ids))
+    query, names = _document_query(fields)
+    documents = await get_many(db, models.Document, ids, query)
+    return _json(List[schemas.DocumentFields], documents, include={"__all__": names})
 
 # CRUD for Quiz
-@app.post(f"{settings.api_v1_prefix}/quizzes/", response_model=Quiz, tags=["Quizzes"])
-async def create_quiz(quiz: QuizCreate, db: AsyncSession = Depends(get_db)):
-    db_quiz = Quiz(title=quiz.title, owner_id=quiz.owner_id)
+@app.post(f"{settings.api_v1_prefix}/quizzes/", response_model=schemas.Quiz, tags=["Quizzes"])
+async def create_quiz(quiz: schemas.QuizCreate, db: AsyncSession = Depends(get_db)):
+    db_quiz = models.Quiz(title=quiz.title, owner_id=quiz.owner_id)
     db.add(db_quiz)
     await db.commit()
     await db.refresh(db_quiz)
+    await response_cache.invalidate("user", quiz.owner_id)
     return db_quiz
 
-@app.get(f"{settings.api_v1_prefix}/quizzes/{{quiz_id}}", response_model=Quiz, tags=["Quizzes"])
-async def get_quiz(quiz_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Quiz).filter(Quiz.id == quiz_id))
-    db_quiz = result.scalars().first()
-    if db_quiz is None:
-        raise HTTPException(status_code=404, detail="Quiz not found")
-    return db_quiz
+@app.get(f"{settings.api_v1_prefix}/quizzes/{{quiz_id}}", response_model=schemas.QuizDetail, response_model_exclude_none=True, tags=["Quizzes"])
+async def get_quiz(request: Request, quiz_id: int, expand: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    fields = _parse_expand(expand, schemas.QUIZ_EXPANSIONS)
+    key = cache_key("quiz", quiz_id, fields)
+    entry = await response_cache.get(key)
+    if entry is None:
+        query = select(models.Quiz).filter(models.Quiz.id == quiz_id)
+        if "questions" in fields:
+            query = query.options(selectinload(models.Quiz.questions))
+        result = await db.execute(query)
+        db_quiz = result.scalars().first()
+        if db_quiz is None:
+            raise HTTPException(status_code=404, detail="Quiz not found")
+        body = schemas.dump_json(schemas.QuizDetail, _quiz_detail(db_quiz, fields), exclude_none=True)
+        entry = await response_cache.set(key, body)
+    return etag_response(request, entry)
+
+@app.get(f"{settings.api_v1_prefix}/quizzes/{{quiz_id}}/questions", response_model=schemas.Page[schemas.Question], tags=["Quizzes"])
+async def list_quiz_questions(
+    quiz_id: int,
+    after: Optional[int] = None,
+    limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+    db: AsyncSession = Depends(get_read_db),
+):
+    query = select(models.Question).filter(models.Question.quiz_id == quiz_id)
+    questions, next_cursor = await keyset_page(db, query, models.Question, after, limit)
+    return _json(schemas.Page[schemas.Question], {"items": questions, "next_cursor": next_cursor})
+
+@app.post(f"{settings.api_v1_prefix}/quizzes/batch", response_model=schemas.BatchResult, tags=["Quizzes"])
+async def create_quizzes(quizzes: List[schemas.QuizCreate], db: AsyncSession = Depends(get_db)):
+    return await _insert_owned_batch(db, models.Quiz, quizzes)
+
+@app.get(f"{settings.api_v1_prefix}/quizzes", response_model=List[schemas.Quiz], tags=["Quizzes"])
+async def get_quizzes(ids: List[int] = Query(...), db: AsyncSession = Depends(get_read_db)):
+    _check_batch_size(len(ids))
+    return _json(List[schemas.Quiz], await get_many(db, models.Quiz, ids))
 
 # CRUD for Question
-@app.post(f"{settings.api_v1_prefix}/questions/", response_model=Question, tags=["Questions"])
-async def create_question(question: QuestionCreate, db: AsyncSession = Depends(get_db)):
-    db_question = Question(text=question.text, quiz_id=question.quiz_id)
+@app.post(f"{settings.api_v1_prefix}/questions/", response_model=schemas.Question, tags=["Questions"])
+async def create_question(question: schemas.QuestionCreate, db: AsyncSession = Depends(get_db)):
+    db_question = models.Question(**question.model_dump())
     db.add(db_question)
     await db.commit()
     await db.refresh(db_question)
+    await response_cache.invalidate("quiz", question.quiz_id)
     return db_question
 
-@app.get(f"{settings.api_v1_prefix}/questions/{{question_id}}", response_model=Question, tags=["Questions"])
-async def get_question(question_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Question).filter(Question.id == question_id))
-    db_question = result.scalars().first()
-    if db_question is None:
-        raise HTTPException(status_code=404, detail="Question not found")
-    return db_question
\ No newline at end of file
+@app.get(f"{settings.api_v1_prefix}/questions/{{question_id}}", response_model=schemas.Question, tags=["Questions"])
+async def get_question(request: Request, question_id: int, db: AsyncSession = Depends(get_db)):
+    key = cache_key("question", question_id)
+    entry = await response_cache.get(key)
+    if entry is None:
+        result = await db.execute(select(models.Question).filter(models.Question.id == question_id))
+        db_question = result.scalars().first()
+        if db_question is None:
+            raise HTTPException(status_code=404, detail="Question not found")
+        body = schemas.dump_json(schemas.Question, db_question)
+        entry = await response_cache.set(key, body)
+    return etag_response(request, entry)
+
+@app.post(f"{settings.api_v1_prefix}/questions/batch", response_model=schemas.BatchResult, tags=["Questions"])
+async def create_questions(questions: List[schemas.QuestionCreate], db: AsyncSession = Depends(get_db)):
+    _check_batch_size(len(questions))
+    quizzes = await existing_ids(db, models.Quiz, (question.quiz_id for question in questions))
+    rows, errors = {}, {}
+    for i, question in enumerate(questions):
+        if question.quiz_id in quizzes:
+            rows[i] = question.model_dump()
+        else:
+            errors[i] = f"Quiz {question.quiz_id} not found"
+    return await _insert_batch(db, models.Question, rows, errors, len(questions), invalidate=("quiz", "quiz_id"))
+
+@app.get(f"{settings.api_v1_prefix}/questions", response_model=List[schemas.Question], tags=["Questions"])
+async def get_questions(ids: List[int] = Query(...), db: AsyncSession = Depends(get_read_db)):
+    _check_batch_size(len(ids))
+    return _json(List[schemas.Question], await get_many(db, models.Question, ids))
+
+# Full-text search over documents and questions; next_cursor is the offset of the next page
+@app.get(f"{settings.api_v1_prefix}/search", response_model=schemas.Page[schemas.SearchHit], tags=["Search"])
+async def search(
+    q: str = Query(..., min_length=1, max_length=256),
+    kind: Optional[Literal["document", "question"]] = None,
+    user_id: Optional[int] = None,
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if db.bind.dialect.name != "postgresql":
+        raise HTTPException(status_code=501, detail="Search requires PostgreSQL")
+    rows = (await db.execute(search_query(q, kind, user_id, cursor, limit))).mappings().all()
+    return _json(schemas.Page[schemas.SearchHit], {
+        "items": rows[:limit],
+        "next_cursor": cursor + limit if len(rows) > limit else None,
+    })
+
+# Quiz generation is rate limited per document owner and globally (429), and streaming runs must
+# get through the admission queue (503); both answer with Retry-After
+def _overloaded(e: Overloaded, status_code: int) -> HTTPException:
+    return HTTPException(status_code=status_code, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+
+# Quiz generation jobs
+@app.post(f"{settings.api_v1_prefix}/documents/{{document_id}}/jobs", response_model=schemas.Job, status_code=202, tags=["Jobs"])
+async def submit_job(document_id: int, job: schemas.JobCreate, db: AsyncSession = Depends(get_db)):
+    db_document = await db.get(models.Document, document_id)
+    if db_document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    try:
+        await rate_limiter.check(db_document.owner_id)
+    except Overloaded as e:
+        raise _overloaded(e, 429)
+    try:
+        return await job_queue.submit(
+            db,
+            document_id=document_id,
+            user_id=db_document.owner_id,
+            priority=PRIORITIES[job.priority],
+            params={"batch": job.batch, "num_questions": job.num_questions},
+        )
+    except QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Job queue is full",
+            headers={"Retry-After": str(settings.jobs_retry_after_seconds)},
+        )
+
+@app.get(f"{settings.api_v1_prefix}/jobs/{{job_id}}", response_model=schemas.Job, tags=["Jobs"])
+async def get_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    db_job = await db.get(models.WorkflowJob, job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@app.get(f"{settings.api_v1_prefix}/jobs/{{job_id}}/result", response_model=schemas.JobResult, tags=["Jobs"])
+async def get_job_result(job_id: int, db: AsyncSession = Depends(get_db)):
+    db_job = await db.get(models.WorkflowJob, job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@app.post(f"{settings.api_v1_prefix}/jobs/{{job_id}}/cancel", response_model=schemas.Job, tags=["Jobs"])
+async def cancel_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    db_job = await db.get(models.WorkflowJob, job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if db_job.status in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job already {db_job.status}")
+    return await job_queue.cancel(db, db_job)
+
+# Streaming quiz generation: LLM tokens, then each validated question, then the stored quiz id
+async def _quiz_events(document_id: int, user_id: int, batch: bool, num_questions: Optional[int]):
+    session_id = f"stream-{uuid.uuid4().hex}"
+    try:
+        graph = quiz_graph(batch)
+        async with AsyncSessionLocal() as db, one_off_thread(graph, session_id) as configurable:
+            async for event in graph.astream(
+                quiz_state(session_id, user_id, document_id, num_questions),
+                config={"configurable": {**configurable, "db": db}},
+                stream_mode="custom",
+            ):
+                yield event
+    except Exception as e:
+        yield {"event": "error", "detail": str(e)}
+
+async def _stream_owner(db: AsyncSession, document_id: int) -> Optional[int]:
+    db_document = await db.get(models.Document, document_id)
+    return db_document.owner_id if db_document else None
+
+@app.get(f"{settings.api_v1_prefix}/documents/{{document_id}}/quiz/stream", tags=["Quizzes"])
+async def stream_quiz(
+    document_id: int,
+    batch: bool = True,
+    num_questions: Optional[int] = Query(None, ge=1, le=100),
+):
+    # A short-lived session: a Depends(get_db) session would stay checked out until the stream
+    # ends, next to the one _quiz_events holds for the run
+    async with AsyncSessionLocal() as db:
+        owner_id = await _stream_owner(db, document_id)
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    try:
+        await rate_limiter.check(owner_id)
+    except Overloaded as e:
+        raise _overloaded(e, 429)
+    try:
+        ticket = await admission.acquire()
+    except Overloaded as e:
+        raise _overloaded(e, 503)
+
+    async def body():
+        try:
+            async for event in _quiz_events(document_id, owner_id, batch, num_questions):
+                yield b"event: " + event["event"].encode() + b"\ndata: " + orjson.dumps(event) + b"\n\n"
+        finally:
+            ticket.release()
+
+    # The background task also releases the slot if the client is gone before the body starts
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(ticket.release),
+    )
+
+@app.websocket(f"{settings.api_v1_prefix}/documents/{{document_id}}/quiz/ws")
+async def stream_quiz_ws(
+    websocket: WebSocket,
+    document_id: int,
+    batch: bool = True,
+    num_questions: Optional[int] = Query(None, ge=1, le=100),
+):
+    async with AsyncSessionLocal() as db:
+        owner_id = await _stream_owner(db, document_id)
+    if owner_id is None:
+        await websocket.close(code=1008, reason="Document not found")
+        return
+    try:
+        await rate_limiter.check(owner_id)
+        ticket = await admission.acquire()
+    except Overloaded as e:
+        # 1013 Try Again Later
+        await websocket.close(code=1013, reason=f"{e.reason}; retry after {e.retry_after}s")
+        return
+    try:
+        await websocket.accept()
+        async for event in _quiz_events(document_id, owner_id, batch, num_questions):
+            await websocket.send_text(orjson.dumps(event).decode())
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        ticket.release()
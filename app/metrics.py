@@ -0,0 +1,204 @@
+import logging
+import os
+import time
+import uuid
+from contextvars import ContextVar
+import psutil
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served", multiprocess_mode="livesum")
+DB_CHECKOUT_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a pooled connection", ["engine"], buckets=DB_BUCKETS,
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Statement execution time by verb", ["engine", "verb"], buckets=DB_BUCKETS,
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "LLM call duration", ["mode", "outcome"], buckets=LLM_BUCKETS,
+)
+LLM_COMPLETION_TOKENS = Counter("llm_completion_tokens_total", "Completion tokens generated", ["mode"])
+LLM_TOKENS_PER_SECOND = Histogram(
+    "llm_tokens_per_second", "Completion tokens per second of a call", ["mode"],
+    buckets=(1, 2, 5, 10, 20, 40, 80, 160, 320),
+)
+EMBEDDING_BATCH_SECONDS = Histogram(
+    "embedding_batch_duration_seconds", "Duration of one batched encode call", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+ADMISSION_RUNNING = Gauge("quiz_admission_running", "Quiz pipeline runs holding a slot", multiprocess_mode="livesum")
+ADMISSION_WAITING = Gauge("quiz_admission_waiting", "Quiz pipeline runs waiting for a slot", multiprocess_mode="livesum")
+ADMISSION_REJECTIONS = Counter("quiz_admission_rejections_total", "Quiz generation requests refused", ["reason"])
+GENERATION_CACHE_LOOKUPS = Counter("generation_cache_lookups_total", "LLM generation cache lookups", ["result"])
+GENERATION_CACHE_BYTES = Gauge("generation_cache_bytes", "Size of the on-disk generation cache", multiprocess_mode="max")
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size", "Texts per batched encode call", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+
+class ProcessCollector:
+    """Process RSS, CPU time and utilisation, threads and open files via psutil, read at scrape time."""
+
+    def __init__(self):
+        self.process = psutil.Process()
+        self.process.cpu_percent()  # Primes the counter; later calls report usage since the previous scrape
+
+    def collect(self):
+        with self.process.oneshot():
+            memory = self.process.memory_info()
+            cpu = self.process.cpu_times()
+            yield GaugeMetricFamily("app_process_rss_bytes", "Resident set size", value=memory.rss)
+            yield GaugeMetricFamily("app_process_cpu_seconds", "User plus system CPU time", value=cpu.user + cpu.system)
+            yield GaugeMetricFamily("app_process_cpu_percent", "CPU utilisation since the previous scrape", value=self.process.cpu_percent())
+            yield GaugeMetricFamily("app_process_threads", "Threads", value=self.process.num_threads())
+            yield GaugeMetricFamily("app_process_open_fds", "Open file descriptors", value=self.process.num_fds())
+
+
+class PoolCollector:
+    """Connection pool occupancy of the instrumented engines, read at scrape time."""
+
+    def __init__(self):
+        self.engines = {}
+
+    def collect(self):
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["engine"])
+        idle = GaugeMetricFamily("db_pool_checked_in", "Idle pooled connections", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Connections opened beyond pool_size", labels=["engine"])
+        for name, engine in self.engines.items():
+            pool = engine.pool  # Looked up each time: dispose() replaces the pool
+            if hasattr(pool, "checkedout"):
+                checked_out.add_metric([name], pool.checkedout())
+                idle.add_metric([name], pool.checkedin())
+                overflow.add_metric([name], pool.overflow())
+        yield checked_out
+        yield idle
+        yield overflow
+
+
+pool_collector = PoolCollector()
+process_collector = ProcessCollector()
+REGISTRY.register(pool_collector)
+REGISTRY.register(process_collector)
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Time statements through engine events and pool checkouts (including waits for a free connection)."""
+    sync_engine = engine.sync_engine
+    if name in pool_collector.engines:
+        return
+    pool_collector.engines[name] = sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        if not conn.info.get("query_start"):
+            return
+        started = conn.info["query_start"].pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        if verb not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+            verb = "OTHER"
+        DB_QUERY_SECONDS.labels(name, verb).observe(time.perf_counter() - started)
+
+    # The pool has no "checkout started" event, so the wait is timed around the engine's checkout call
+    raw_connection = sync_engine.raw_connection
+
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            DB_CHECKOUT_WAIT_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+    sync_engine.raw_connection = timed_raw_connection
+
+
+def observe_llm_call(mode: str, started: float, tokens: int, outcome: str = "ok") -> None:
+    elapsed = time.perf_counter() - started
+    LLM_REQUEST_SECONDS.labels(mode, outcome).observe(elapsed)
+    if tokens:
+        LLM_COMPLETION_TOKENS.labels(mode).inc(tokens)
+        if elapsed > 0:
+            LLM_TOKENS_PER_SECOND.labels(mode).observe(tokens / elapsed)
+
+
+def metrics_response() -> Response:
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Prefork workers (run_server.py): counters and histograms are summed over every worker's
+        # files; the process and pool gauges describe the worker that answered this scrape
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(pool_collector)
+        registry.register(process_collector)
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def install_request_id_logging() -> None:
+    # Every record gets request_id, whichever handler or formatter ends up emitting it
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, "adds_request_id", False):
+        return
+
+    def record_factory(*args, **kwargs):
+        record = factory(*args, **kwargs)
+        record.request_id = request_id_var.get()
+        return record
+
+    record_factory.adds_request_id = True
+    logging.setLogRecordFactory(record_factory)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request ids (X-Request-ID in and out) and per-route latency histograms.
+
+    Routes are labelled by their template (/api/v1/users/{user_id}), never the raw path, so label
+    cardinality stays bounded. Streaming responses are timed until the body is complete.
+    """
+
+    def __init__(self, app, header: str = "x-request-id"):
+        self.app = app
+        self.header = header.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == self.header:
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(self.header, request_id.encode("latin-1"))]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
+            request_id_var.reset(token)
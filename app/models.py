@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, BigInteger, Integer, String, ForeignKey, Text, Index, LargeBinary, Boolean, DateTime, JSON, DDL, event, func
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -7,16 +8,53 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     email = Column(String, unique=True, index=True)
-    quizzes = relationship("Quiz", back_populates="owner")
-    documents = relationship("Document", back_populates="owner")
+    quizzes = relationship("Quiz", back_populates="owner", order_by="Quiz.id")
+    documents = relationship("Document", back_populates="owner", order_by="Document.id")
 
 class Document(Base):
     __tablename__ = "documents"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
-    content = Column(Text)
+    content_hash = Column(String(64))  # sha256 of the stored content; duplicate uploads are skipped
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="documents")
+    # The content lives in document_contents and is never loaded implicitly: select
+    # DocumentContent.content, or load with selectinload(Document.body), when it is needed
+    body = relationship("DocumentContent", uselist=False, lazy="raise", cascade="all, delete-orphan", passive_deletes=True)
+    content = association_proxy("body", "content", creator=lambda content: DocumentContent(content=content))
+    # Keyset pagination over a user's documents: WHERE owner_id = ? AND id > ? ORDER BY id
+    __table_args__ = (
+        Index("ix_documents_owner_id_id", "owner_id", "id"),
+        Index("ix_documents_owner_id_content_hash", "owner_id", "content_hash"),
+    )
+
+# Document text, one row per document, kept out of the documents row so metadata reads never touch it.
+# On PostgreSQL 14+ built with lz4 the column is TOAST-compressed with lz4 rather than pglz; either way
+# the text stays readable in SQL for ts_headline and the search_vector trigger
+class DocumentContent(Base):
+    __tablename__ = "document_contents"
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    content = Column(Text, nullable=False)
+
+# The same text as UTF-8 bytes in zstd-compressed slices of about document_chunk_bytes, so a byte
+# range is served by decompressing only the slices it overlaps
+class DocumentContentChunk(Base):
+    __tablename__ = "document_content_chunks"
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    byte_offset = Column(BigInteger, primary_key=True)
+    size = Column(Integer, nullable=False)  # Uncompressed bytes
+    data = Column(LargeBinary, nullable=False)
+
+# Normalized text of an in-progress streaming upload, assembled into document_contents when it completes;
+# packed is the same slice in document_content_chunks form, copied over as is
+class DocumentUploadChunk(Base):
+    __tablename__ = "document_upload_chunks"
+    upload_id = Column(String(32), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    data = Column(Text, nullable=False)
+    byte_offset = Column(BigInteger, nullable=False)
+    size = Column(Integer, nullable=False)
+    packed = Column(LargeBinary, nullable=False)
 
 class Quiz(Base):
     __tablename__ = "quizzes"
@@ -24,11 +62,122 @@ class Quiz(Base):
     title = Column(String, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="quizzes")
-    questions = relationship("Question", back_populates="quiz")
+    questions = relationship("Question", back_populates="quiz", order_by="Question.id")
+    __table_args__ = (Index("ix_quizzes_owner_id_id", "owner_id", "id"),)
 
 class Question(Base):
     __tablename__ = "questions"
     id = Column(Integer, primary_key=True, index=True)
     text = Column(Text)
+    correct_answer = Column(Text)
+    explanation = Column(Text)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"))
-    quiz = relationship("Quiz", back_populates="questions")
\ No newline at end of file
+    quiz = relationship("Quiz", back_populates="questions")
+    __table_args__ = (Index("ix_questions_quiz_id_id", "quiz_id", "id"),)
+
+# LangGraph checkpoints: one row per (thread, namespace, step); only the latest few steps are kept
+class WorkflowCheckpoint(Base):
+    __tablename__ = "workflow_checkpoints"
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    step = Column(Integer, primary_key=True)
+    checkpoint_id = Column(String, nullable=False)
+    parent_checkpoint_id = Column(String)
+    checkpoint = Column(LargeBinary, nullable=False)  # Compressed, serialized checkpoint
+    metadata_ = Column("metadata", LargeBinary, nullable=False)
+    __table_args__ = (
+        Index("ix_workflow_checkpoints_checkpoint_id", "thread_id", "checkpoint_ns", "checkpoint_id", unique=True),
+    )
+
+class WorkflowCheckpointWrite(Base):
+    __tablename__ = "workflow_checkpoint_writes"
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, primary_key=True)
+    task_id = Column(String, primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    channel = Column(String, nullable=False)
+    value = Column(LargeBinary, nullable=False)
+
+# Quiz generation jobs; the table doubles as a persistent priority queue
+class WorkflowJob(Base):
+    __tablename__ = "workflow_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, running, succeeded, failed, cancelled
+    priority = Column(Integer, nullable=False, default=0)
+    params = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")  # Claims so far; see jobs_max_attempts
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    # Claim order: highest priority first, then oldest
+    __table_args__ = (Index("ix_workflow_jobs_status_priority_id", "status", "priority", "id"),)
+
+# Responses to POST requests sent with an Idempotency-Key; status_code is NULL while the first request runs
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64))  # sha256 of method, path, query string and body
+    status_code = Column(Integer)
+    headers = Column(JSON)
+    body = Column(LargeBinary)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    __table_args__ = (Index("ix_idempotency_keys_created_at", "created_at"),)
+
+# Full-text search (PostgreSQL): tsvector columns with GIN indexes, plus a trigram index on document
+# titles for fuzzy lookups. documents.search_vector covers the title and the content in
+# document_contents, so triggers on both tables maintain it instead of a generated column. Emitted as
+# DDL on create instead of mapped columns so the models still create on other dialects; migrations
+# 9b4f1d6e2a87 and 8f3a6d2c5e41 add the same objects to existing databases.
+DOCUMENT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce({title}, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({content}, '')), 'B')"
+)
+QUESTION_SEARCH_VECTOR = "to_tsvector('english', coalesce(text, ''))"
+SEARCH_DDL = {
+    Document.__table__: [
+        "ALTER TABLE documents ADD COLUMN search_vector tsvector",
+        "CREATE INDEX ix_documents_search_vector ON documents USING gin (search_vector)",
+        "CREATE INDEX ix_documents_title_trgm ON documents USING gin (title gin_trgm_ops)",
+        f"""CREATE FUNCTION documents_search_vector_title() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := {DOCUMENT_SEARCH_VECTOR.format(
+        title="NEW.title", content="(SELECT content FROM document_contents WHERE document_id = NEW.id)",
+    )};
+    RETURN NEW;
+END $$""",
+        "CREATE TRIGGER documents_search_vector BEFORE INSERT OR UPDATE OF title ON documents "
+        "FOR EACH ROW EXECUTE FUNCTION documents_search_vector_title()",
+    ],
+    DocumentContent.__table__: [
+        # Servers older than 14 or built without lz4 keep pglz
+        """DO $$ BEGIN
+    IF current_setting('server_version_num')::int >= 140000 THEN
+        EXECUTE 'ALTER TABLE document_contents ALTER COLUMN content SET COMPRESSION lz4';
+    END IF;
+EXCEPTION WHEN feature_not_supported THEN NULL;
+END $$""",
+        f"""CREATE FUNCTION documents_search_vector_content() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE documents SET search_vector = {DOCUMENT_SEARCH_VECTOR.format(title="title", content="NEW.content")}
+    WHERE id = NEW.document_id;
+    RETURN NULL;
+END $$""",
+        "CREATE TRIGGER document_contents_search_vector AFTER INSERT OR UPDATE OF content ON document_contents "
+        "FOR EACH ROW EXECUTE FUNCTION documents_search_vector_content()",
+    ],
+    Question.__table__: [
+        f"ALTER TABLE questions ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({QUESTION_SEARCH_VECTOR}) STORED",
+        "CREATE INDEX ix_questions_search_vector ON questions USING gin (search_vector)",
+    ],
+}
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+for table, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -0,0 +1,210 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+from .config import settings
+from .metrics import ADMISSION_REJECTIONS, ADMISSION_RUNNING, ADMISSION_WAITING
+
+# A token bucket: (key, tokens added per second, capacity)
+Bucket = Tuple[str, float, int]
+
+
+class Overloaded(Exception):
+    """Refused before any work was done; the caller should retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimitBackend:
+    async def acquire(self, buckets: List[Bucket]) -> List[float]:
+        """Take one token from every bucket, or none of them if any is empty.
+
+        Returns, per bucket, the seconds until it has a token again (all 0 when granted).
+        """
+        raise NotImplementedError
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets; used for tests and single-node runs."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float, float, int]] = {}  # key -> (tokens, updated, rate, burst)
+
+    async def acquire(self, buckets: List[Bucket]) -> List[float]:
+        now = time.monotonic()
+        levels, waits = [], []
+        for key, rate, burst in buckets:
+            tokens, updated, _, _ = self._buckets.get(key, (burst, now, rate, burst))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            levels.append(tokens)
+            waits.append((1 - tokens) / rate if tokens < 1 else 0.0)
+        if any(waits):
+            return waits
+        for (key, rate, burst), tokens in zip(buckets, levels):
+            self._buckets[key] = (tokens - 1, now, rate, burst)
+        if len(self._buckets) > self.max_keys:
+            # Buckets that have refilled completely are indistinguishable from new ones
+            self._buckets = {
+                key: state for key, state in self._buckets.items()
+                if state[0] + (now - state[1]) * state[2] < state[3]
+            }
+        return waits
+
+
+# KEYS are bucket keys, ARGV holds rate and burst per key; all-or-nothing like the in-memory backend
+_TOKEN_BUCKET_LUA = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local levels, waits, denied = {}, {}, false
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - updated) * rate)
+    levels[i] = tokens
+    waits[i] = '0'
+    if tokens < 1 then
+        waits[i] = tostring((1 - tokens) / rate)
+        denied = true
+    end
+end
+if denied then return waits end
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', levels[i] - 1, 'updated', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return waits
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by every worker and node, updated atomically by a Lua script."""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("A redis:// ratelimit_url requires the 'redis' package") from e
+        self.client = redis.from_url(url)
+        self.script = self.client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def acquire(self, buckets: List[Bucket]) -> List[float]:
+        args = [value for _, rate, burst in buckets for value in (rate, burst)]
+        waits = await self.script(keys=[f"ratelimit:{key}" for key, _, _ in buckets], args=args)
+        return [float(wait) for wait in waits]
+
+
+def create_backend(url: Optional[str]) -> RateLimitBackend:
+    if not url or url.startswith("memory://"):
+        return InMemoryRateLimitBackend()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisRateLimitBackend(url)
+    raise ValueError(f"Unsupported ratelimit_url: {url}")
+
+
+class RateLimiter:
+    """Per-user and global token buckets for quiz generation requests."""
+
+    def __init__(self, backend: RateLimitBackend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+
+    async def check(self, user_id: int) -> None:
+        if not self.enabled:
+            return
+        user_wait, global_wait = await self.backend.acquire([
+            (f"user:{user_id}", settings.ratelimit_user_per_minute / 60, settings.ratelimit_user_burst),
+            ("global", settings.ratelimit_global_per_minute / 60, settings.ratelimit_global_burst),
+        ])
+        if user_wait:
+            ADMISSION_REJECTIONS.labels("user_rate").inc()
+            raise Overloaded("Rate limit exceeded for this user", max(user_wait, global_wait))
+        if global_wait:
+            ADMISSION_REJECTIONS.labels("global_rate").inc()
+            raise Overloaded("Quiz generation is at capacity", global_wait)
+
+
+class Ticket:
+    """A running slot in the admission queue; release() is idempotent."""
+
+    def __init__(self, queue: "AdmissionQueue"):
+        self.queue = queue
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.queue._finish(time.monotonic() - self.started)
+
+
+class AdmissionQueue:
+    """Bounded admission in front of the quiz pipeline: max_running runs at once, max_waiting queued.
+
+    Requests beyond that are refused immediately with a Retry-After estimated from recent run
+    durations, instead of piling up in front of the LLM backend. Background jobs wait for a slot
+    without being refused; their backlog is already bounded by jobs_max_pending.
+    """
+
+    def __init__(self, max_running: int, max_waiting: int, max_wait: float):
+        self.max_running = max_running
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.running = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_running)
+        self._average_run: Optional[float] = None
+
+    def retry_after(self) -> float:
+        # Time for the runs ahead of a new request to clear the running slots
+        return (self._average_run or 1.0) * (self.waiting + 1) / self.max_running
+
+    async def acquire(self, reject: bool = True) -> Ticket:
+        if reject and self.running >= self.max_running and self.waiting >= self.max_waiting:
+            ADMISSION_REJECTIONS.labels("queue_full").inc()
+            raise Overloaded("Quiz generation queue is full", self.retry_after())
+        self.waiting += 1
+        ADMISSION_WAITING.inc()
+        try:
+            if reject:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.max_wait)
+            else:
+                await self._slots.acquire()
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTIONS.labels("wait_timeout").inc()
+            raise Overloaded("Timed out waiting for a quiz generation slot", self.retry_after())
+        finally:
+            self.waiting -= 1
+            ADMISSION_WAITING.dec()
+        self.running += 1
+        ADMISSION_RUNNING.inc()
+        return Ticket(self)
+
+    @asynccontextmanager
+    async def slot(self, reject: bool = True):
+        ticket = await self.acquire(reject)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _finish(self, elapsed: float) -> None:
+        self.running -= 1
+        ADMISSION_RUNNING.dec()
+        self._slots.release()
+        self._average_run = elapsed if self._average_run is None else 0.8 * self._average_run + 0.2 * elapsed
+
+
+rate_limiter = RateLimiter(create_backend(settings.ratelimit_url), enabled=settings.ratelimit_enabled)
+admission = AdmissionQueue(
+    max_running=settings.admission_max_running,
+    max_waiting=settings.admission_max_waiting,
+    max_wait=settings.admission_max_wait_seconds,
+)
@@ -1,5 +1,9 @@
-from pydantic import BaseModel
-from typing import Optional
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from datetime import datetime
+from typing import Any, Dict, Generic, List, Literal, Optional, TypeVar
+
+T = TypeVar("T")
 
 class UserCreate(BaseModel):
     name: str
@@ -9,8 +13,7 @@ class User(BaseModel):
     id: int
     name: str
     email: str
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class DocumentCreate(BaseModel):
     title: str
@@ -22,8 +25,25 @@ class Document(BaseModel):
     title: str
     content: str
     owner_id: int
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Sparse fieldsets: ?fields=title,owner_id returns only those keys of a document
+DOCUMENT_FIELDS = {"id", "title", "content", "owner_id"}
+
+class DocumentFields(BaseModel):
+    id: int
+    title: Optional[str] = None
+    content: Optional[str] = None
+    owner_id: Optional[int] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class DocumentUploadResult(BaseModel):
+    id: int
+    title: str
+    owner_id: int
+    content_hash: str
+    size: int  # Bytes of normalized UTF-8 content
+    duplicate: bool  # True when the owner already had this content; no new document was created
 
 class QuizCreate(BaseModel):
     title: str
@@ -33,16 +53,89 @@ class Quiz(BaseModel):
     id: int
     title: str
     owner_id: int
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class QuestionCreate(BaseModel):
     text: str
+    correct_answer: Optional[str] = None
+    explanation: Optional[str] = None
     quiz_id: int
 
 class Question(BaseModel):
     id: int
     text: str
+    correct_answer: Optional[str] = None
+    explanation: Optional[str] = None
     quiz_id: int
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+# Expanded views; relationship fields stay None unless requested with ?expand=
+USER_EXPANSIONS = {"quizzes", "quizzes.questions", "documents"}
+QUIZ_EXPANSIONS = {"questions"}
+
+class QuizDetail(Quiz):
+    questions: Optional[List[Question]] = None
+
+class UserDetail(User):
+    quizzes: Optional[List[QuizDetail]] = None
+    documents: Optional[List[Document]] = None
+
+# Keyset page: pass next_cursor back as ?after= to fetch the following page
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[int] = None
+
+class SearchHit(BaseModel):
+    kind: Literal["document", "question"]
+    id: int
+    title: Optional[str] = None  # Documents only
+    quiz_id: Optional[int] = None  # Questions only
+    rank: float
+    snippet: Optional[str] = None  # HTML: escaped text with the matched terms wrapped in <mark>
+
+class BatchItemResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BatchItemResult]
+
+class JobCreate(BaseModel):
+    priority: Literal["low", "normal", "high"] = "normal"
+    batch: bool = True
+    num_questions: Optional[int] = Field(default=None, ge=1, le=100)
+
+class Job(BaseModel):
+    id: int
+    document_id: int
+    user_id: int
+    status: str
+    priority: int
+    cancel_requested: bool
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class JobResult(BaseModel):
+    id: int
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    model_config = ConfigDict(from_attributes=True)
+
+# Validate ORM rows and encode straight to JSON bytes in pydantic-core, without FastAPI's
+# intermediate dicts; adapters are built once per response type
+@lru_cache(maxsize=None)
+def adapter(tp) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+def dump_json(tp, value, exclude_none: bool = False, include=None) -> bytes:
+    type_adapter = adapter(tp)
+    return type_adapter.dump_json(type_adapter.validate_python(value), exclude_none=exclude_none, include=include)
@@ -0,0 +1,73 @@
+from typing import Optional
+from sqlalchemy import Float, case, func, literal, literal_column, null, or_, select, union_all
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from .models import Document, DocumentContent, Question, Quiz
+
+# Highlighted fragments around the matches; matched terms are wrapped in <mark>. The source text is
+# HTML-escaped before ts_headline, so <mark> is the only markup a snippet can contain.
+HEADLINE_OPTIONS = 'MaxFragments=2, MaxWords=30, MinWords=12, FragmentDelimiter=" … ", StartSel=<mark>, StopSel=</mark>'
+
+_config = literal_column("'english'::regconfig")
+_document_vector = literal_column("documents.search_vector", TSVECTOR)
+_question_vector = literal_column("questions.search_vector", TSVECTOR)
+# & first, so the entities added by the other replacements are not escaped again
+_HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#39;"))
+
+
+def _html_escaped(column):
+    for char, entity in _HTML_ESCAPES:
+        column = func.replace(column, char, entity)
+    return column
+
+
+def search_query(q: str, kind: Optional[str], owner_id: Optional[int], offset: int, limit: int):
+    """Ranked document/question matches for q (web search syntax), one page plus a lookahead row.
+
+    Matching and ranking use the GIN-indexed search_vector columns; document titles also match
+    fuzzily through the trigram index. Snippets are only computed for the rows on the page.
+    """
+    tsquery = func.websearch_to_tsquery(_config, q)
+    branches = []
+    if kind in (None, "document"):
+        documents = select(
+            literal("document").label("kind"),
+            Document.id.label("id"),
+            Document.title.label("title"),
+            null().label("quiz_id"),
+            (func.ts_rank_cd(_document_vector, tsquery) + func.similarity(Document.title, q)).cast(Float).label("rank"),
+        ).where(or_(_document_vector.op("@@")(tsquery), Document.title.op("%")(q)))
+        if owner_id is not None:
+            documents = documents.where(Document.owner_id == owner_id)
+        branches.append(documents)
+    if kind in (None, "question"):
+        questions = select(
+            literal("question").label("kind"),
+            Question.id.label("id"),
+            null().label("title"),
+            Question.quiz_id.label("quiz_id"),
+            func.ts_rank_cd(_question_vector, tsquery).cast(Float).label("rank"),
+        ).where(_question_vector.op("@@")(tsquery))
+        if owner_id is not None:
+            questions = questions.join(Quiz, Quiz.id == Question.quiz_id).where(Quiz.owner_id == owner_id)
+        branches.append(questions)
+
+    hits = (union_all(*branches) if len(branches) > 1 else branches[0]).subquery("hits")
+    page = (
+        select(hits)
+        .order_by(hits.c.rank.desc(), hits.c.kind, hits.c.id)
+        .offset(offset)
+        .limit(limit + 1)
+        .subquery("page")
+    )
+    snippet = case(
+        (
+            page.c.kind == "document",
+            select(func.ts_headline(_config, _html_escaped(DocumentContent.content), tsquery, HEADLINE_OPTIONS))
+            .where(DocumentContent.document_id == page.c.id)
+            .scalar_subquery(),
+        ),
+        else_=select(func.ts_headline(_config, _html_escaped(Question.text), tsquery, HEADLINE_OPTIONS))
+        .where(Question.id == page.c.id)
+        .scalar_subquery(),
+    )
+    return select(page, snippet.label("snippet")).order_by(page.c.rank.desc(), page.c.kind, page.c.id)
@@ -0,0 +1,241 @@
+import codecs
+import hashlib
+import uuid
+from typing import Dict, List, Optional
+import zstandard
+from multipart.multipart import parse_options_header
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+from .crud import ordered_concat
+from .models import Document, DocumentContent, DocumentContentChunk, DocumentUploadChunk
+
+FORM_FIELDS = ("title", "owner_id")
+MAX_FIELD_BYTES = 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=settings.document_compression_level).compress(data)
+
+
+def unpack(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def content_chunks(text: str) -> List[dict]:
+    """document_content_chunks values (without document_id) for text: document_chunk_bytes slices of its UTF-8."""
+    encoded = text.encode("utf-8")
+    chunks = []
+    for offset in range(0, len(encoded), settings.document_chunk_bytes):
+        part = encoded[offset:offset + settings.document_chunk_bytes]
+        chunks.append({"byte_offset": offset, "size": len(part), "data": pack(part)})
+    return chunks
+
+
+async def store_content_chunks(db: AsyncSession, contents: Dict[int, str], replace: bool = False) -> None:
+    """Write the compressed slices of each document's text (document id -> text) in db's transaction."""
+    if replace:
+        await db.execute(delete(DocumentContentChunk).where(DocumentContentChunk.document_id.in_(list(contents))))
+    rows = [{"document_id": document_id, **chunk} for document_id, text in contents.items() for chunk in content_chunks(text)]
+    if rows:
+        await db.execute(insert(DocumentContentChunk), rows)
+
+
+class TextNormalizer:
+    """Incremental UTF-8 decoding and normalization of an uploaded text stream.
+
+    Invalid bytes are replaced, a leading BOM and NUL characters are dropped and CRLF/CR line
+    endings become LF, even when a multi-byte character or a CRLF pair straddles two chunks.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._started = False
+        self._pending_cr = False
+
+    def feed(self, data: bytes, final: bool = False) -> str:
+        text = self._decoder.decode(data, final)
+        if text and not self._started:
+            self._started = True
+            text = text.removeprefix("\ufeff")
+        if self._pending_cr:
+            text = "\r" + text
+            self._pending_cr = False
+        if text.endswith("\r") and not final:
+            # Wait for the next chunk to tell a CRLF from a lone CR
+            text = text[:-1]
+            self._pending_cr = True
+        return text.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
+
+
+class DocumentUpload:
+    """Sink for python-multipart's push parser that ingests one document upload.
+
+    The file part is normalized and hashed as it arrives and staged in document_upload_chunks,
+    one row per document_chunk_bytes (as text, and compressed), inside the request's transaction,
+    so memory stays bounded by a single chunk. finish() assembles the document in the database, or
+    rolls the staged rows back when the owner already has a document with the same content.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.upload_id = uuid.uuid4().hex
+        self.fields: Dict[str, str] = {}
+        self.received = 0
+        self.size = 0
+        self.has_file = False
+        self._hash = hashlib.sha256()
+        self._normalizer = TextNormalizer()
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._ready: List[str] = []
+        self._seq = 0
+        self._offset = 0
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._part: Optional[str] = None
+        self._value = bytearray()
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._part = None
+        self._value = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in options or name == "file":
+            if self.has_file:
+                raise ValueError("Only one file part is allowed")
+            self.has_file = True
+            self._part = "file"
+        elif name in FORM_FIELDS:
+            self._part = name
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._part == "file":
+            self.received += end - start
+            if self.received > settings.upload_max_bytes:
+                raise UploadTooLarge()
+            self._add_text(self._normalizer.feed(data[start:end]))
+        elif self._part is not None:
+            self._value += data[start:end]
+            if len(self._value) > MAX_FIELD_BYTES:
+                raise ValueError(f"Form field {self._part} is too long")
+
+    def _on_part_end(self):
+        if self._part == "file":
+            self._add_text(self._normalizer.feed(b"", final=True))
+            self._cut_chunk()
+        elif self._part is not None:
+            self.fields[self._part] = self._value.decode("utf-8", "replace").strip()
+        self._part = None
+
+    def _add_text(self, text: str):
+        if not text:
+            return
+        encoded = text.encode("utf-8")
+        self._hash.update(encoded)
+        self.size += len(encoded)
+        self._buffer.append(text)
+        self._buffered += len(encoded)
+        if self._buffered >= settings.document_chunk_bytes:
+            self._cut_chunk()
+
+    def _cut_chunk(self):
+        if self._buffer:
+            self._ready.append("".join(self._buffer))
+            self._buffer, self._buffered = [], 0
+
+    async def flush(self):
+        """Stage the chunks completed by the last parser.write() call."""
+        if not self._ready:
+            return
+        rows = []
+        for data in self._ready:
+            encoded = data.encode("utf-8")
+            rows.append({
+                "upload_id": self.upload_id, "seq": self._seq, "data": data,
+                "byte_offset": self._offset, "size": len(encoded), "packed": pack(encoded),
+            })
+            self._seq += 1
+            self._offset += len(encoded)
+        self._ready = []
+        await self.db.execute(insert(DocumentUploadChunk), rows)
+
+    @property
+    def content_hash(self) -> str:
+        return self._hash.hexdigest()
+
+    def validate(self) -> tuple:
+        """Return (title, owner_id) or raise ValueError for an incomplete form."""
+        if not self.has_file:
+            raise ValueError("Missing file part")
+        missing = [name for name in FORM_FIELDS if not self.fields.get(name)]
+        if missing:
+            raise ValueError(f"Missing form field(s): {', '.join(missing)}")
+        try:
+            owner_id = int(self.fields["owner_id"])
+        except ValueError:
+            raise ValueError("owner_id must be an integer")
+        return self.fields["title"], owner_id
+
+    async def finish(self, title: str, owner_id: int) -> tuple:
+        """Create the document from the staged chunks; returns (document_id, title, duplicate)."""
+        self._cut_chunk()
+        await self.flush()
+        digest = self.content_hash
+        existing = (await self.db.execute(
+            select(Document.id, Document.title).where(Document.owner_id == owner_id, Document.content_hash == digest).limit(1)
+        )).first()
+        if existing is not None:
+            # Nothing was committed yet, so the staged chunks simply disappear
+            await self.db.rollback()
+            return existing.id, existing.title, True
+        assembled = ordered_concat(
+            self.db.bind.dialect.name, DocumentUploadChunk.data, DocumentUploadChunk.seq,
+            DocumentUploadChunk.upload_id == self.upload_id,
+        )
+        document_id = await self.db.scalar(
+            insert(Document).values(title=title, owner_id=owner_id, content_hash=digest).returning(Document.id)
+        )
+        await self.db.execute(insert(DocumentContent).values(document_id=document_id, content=assembled))
+        await self.db.execute(insert(DocumentContentChunk).from_select(
+            ["document_id", "byte_offset", "size", "data"],
+            select(literal(document_id), DocumentUploadChunk.byte_offset, DocumentUploadChunk.size, DocumentUploadChunk.packed)
+            .where(DocumentUploadChunk.upload_id == self.upload_id),
+        ))
+        await self.db.execute(delete(DocumentUploadChunk).where(DocumentUploadChunk.upload_id == self.upload_id))
+        await self.db.commit()
+        return document_id, title, False
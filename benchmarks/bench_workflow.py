@@ -0,0 +1,122 @@
+"""Benchmark for the LangGraph quiz pipeline.
+
+Uses the stub OpenAI-compatible server in benchmarks/stub_llm.py, the in-memory (numpy)
+vector store and a hashing embedder, so runs are reproducible without a model server,
+Qdrant or model downloads:
+
+    python -m benchmarks.bench_workflow --runs 40 --concurrency 1,4,16 --llm-latency 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import uuid
+
+import numpy as np
+
+from benchmarks.common import measure_allocations, print_table, run_load, write_results
+from benchmarks.stub_llm import start_in_thread
+
+
+class HashingEmbedder:
+    """Deterministic stand-in for SentenceTransformer.encode (hashing trick over words)."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+                vectors[row, int.from_bytes(digest[:4], "little") % self.dim] += 1 if digest[4] & 1 else -1
+        return vectors
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///./benchmarks/results/bench_workflow.db")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--runs", type=int, default=40, help="Workflow runs per scenario and concurrency level")
+    parser.add_argument("--num-questions", type=int, default=10, help="Questions per batch-mode run")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub first-token latency in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="Stub generation rate")
+    parser.add_argument("--document-paragraphs", type=int, default=40)
+    parser.add_argument("--allocations", type=int, default=10, help="Runs per scenario for tracemalloc (0 disables)")
+    parser.add_argument("--generation-cache", action="store_true", help="Keep the LLM generation cache enabled")
+    parser.add_argument("--output", default="benchmarks/results/workflow.json")
+    return parser.parse_args()
+
+
+async def main(args):
+    from app.config import settings
+    from app.database import AsyncSessionLocal, Base, engine
+    from app import models
+    from app.jobs import quiz_graph, quiz_state
+    from app.langgraph.memory import get_memory, save_memory
+    from app.langgraph.provider import provider
+
+    provider._embedder = HashingEmbedder(settings.embedding_dim)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    text = "\n\n".join(
+        f"Paragraph {p}. " + " ".join(f"term{p}_{w}" for w in range(120)) for p in range(args.document_paragraphs)
+    )
+    async with AsyncSessionLocal() as db:
+        user = models.User(name="bench", email=f"{uuid.uuid4().hex}@bench.local")
+        db.add(user)
+        await db.flush()
+        document = models.Document(title="Benchmark document", content=text, owner_id=user.id)
+        db.add(document)
+        await db.commit()
+        user_id, document_id = user.id, document.id
+
+    def workflow_run(batch: bool):
+        async def run(i):
+            session_id = f"bench-{uuid.uuid4().hex}"
+            state = quiz_state(session_id, user_id, document_id, args.num_questions if batch else None)
+            async with AsyncSessionLocal() as db:
+                await quiz_graph(batch).ainvoke(state, config={"configurable": {"thread_id": session_id, "db": db}})
+        return run
+
+    async def memory_round_trip(i):
+        history = [{"user": f"Requested quiz {i}-{n}", "bot": f"Generated question {i}-{n} about term{n}"} for n in range(8)]
+        await save_memory(user_id, history)
+        await get_memory(user_id, f"question about term{i % 8}")
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = {}
+    for name, operation in {
+        "workflow_single_stream": workflow_run(batch=False),
+        "workflow_batch": workflow_run(batch=True),
+        "memory_save_and_search": memory_round_trip,
+    }.items():
+        for concurrency in levels:
+            results[f"{name}@c{concurrency}"] = await run_load(operation, args.runs, concurrency)
+        if args.allocations:
+            results[f"{name}@alloc"] = await measure_allocations(operation, args.allocations)
+    print_table(results)
+    write_results(args.output, "workflow", {
+        "database": args.database_url.split("://", 1)[0],
+        "concurrency": levels,
+        "runs": args.runs,
+        "num_questions": args.num_questions,
+        "llm_latency_s": args.llm_latency,
+        "tokens_per_second": args.tokens_per_second,
+        "llm_max_concurrency": settings.llm_max_concurrency,
+    }, results)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.database_url.startswith("sqlite"):
+        path = args.database_url.split("///", 1)[1]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["OLLAMA_HOST"] = start_in_thread(args.llm_latency, args.tokens_per_second)
+    os.environ["MEMORY_BACKEND"] = "numpy"
+    if not args.generation_cache:
+        os.environ["GENERATION_CACHE_ENABLED"] = "false"
+    asyncio.run(main(args))
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank percentile on an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> dict:
+    ordered = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+    }
+
+
+async def run_load(operation: Callable[[int], Awaitable[None]], total: int, concurrency: int) -> dict:
+    """Run operation(i) for i in range(total) on `concurrency` workers; an exception counts as an error."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                await operation(i)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def measure_allocations(operation: Callable[[int], Awaitable[None]], total: int) -> dict:
+    """Python heap allocations over `total` sequential calls (tracemalloc; run separately from timing)."""
+    await operation(0)  # Warm caches and lazy imports so they are not charged to the operation
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    for i in range(total):
+        await operation(i)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    return {
+        "calls": total,
+        "peak_traced_kib": round(peak / 1024, 1),
+        "retained_kib_per_call": round(sum(stat.size_diff for stat in stats) / 1024 / total, 3),
+        "retained_blocks_per_call": round(sum(stat.count_diff for stat in stats) / total, 2),
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(path: str, suite: str, config: dict, results: Dict[str, dict]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"suite": suite, "environment": environment(), "config": config, "results": results}, f, indent=2)
+    print(f"Results written to {path}")
+
+
+def print_table(results: Dict[str, dict]) -> None:
+    print(f"{'scenario':<48}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, row in results.items():
+        if "p50_ms" in row:
+            print(f"{name:<48}{row['throughput_rps']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['errors']:>8}")
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Regressions beyond `threshold` (0.1 = 10%): higher p95/p99, lower throughput, more retained memory."""
+    regressions = []
+    for name, new in current["results"].items():
+        old: Optional[dict] = baseline["results"].get(name)
+        if old is None:
+            continue
+        for key in ("p95_ms", "p99_ms", "retained_kib_per_call"):
+            if key in new and old.get(key) and new[key] > old[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {old[key]} -> {new[key]}")
+        if new.get("throughput_rps") and old.get("throughput_rps") and new["throughput_rps"] < old["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput_rps {old['throughput_rps']} -> {new['throughput_rps']}")
+        if new.get("errors", 0) > old.get("errors", 0):
+            regressions.append(f"{name}: errors {old.get('errors', 0)} -> {new['errors']}")
+    return regressions
@@ -0,0 +1,102 @@
+"""Stub OpenAI-compatible chat completions server for benchmarking the quiz workflow.
+
+Replies are deterministic valid quiz JSON, after a fixed first-token latency and at a fixed
+tokens-per-second rate, so the workflow can be measured without a model server:
+
+    python -m benchmarks.stub_llm --port 11500 --latency 0.2 --tokens-per-second 50
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import socket
+import threading
+import time
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+CHARS_PER_TOKEN = 4
+
+
+def _reply(prompt: str) -> str:
+    seed = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+    match = re.search(r"Generate exactly (\d+)", prompt)
+    if match is None:
+        return json.dumps({
+            "question": f"What is the main idea of passage {seed}?",
+            "correct_answer": "The main idea",
+            "explanation": "The passage states it directly.",
+        })
+    return json.dumps({"questions": [
+        {
+            # A distinct topic word per question, so the workflow's near-duplicate filter keeps them all
+            "question": f"Question {i} about excerpt {seed}: what does {hashlib.sha1(f'{seed}{i}'.encode()).hexdigest()[:6]} describe?",
+            "correct_answer": f"Answer {i}",
+            "explanation": f"Part {i} of excerpt {seed} says so.",
+        }
+        for i in range(int(match.group(1)))
+    ]})
+
+
+def create_app(latency: float, tokens_per_second: float) -> Starlette:
+    async def chat_completions(request: Request):
+        body = await request.json()
+        content = _reply(body["messages"][-1]["content"])
+        tokens = [content[i:i + CHARS_PER_TOKEN] for i in range(0, len(content), CHARS_PER_TOKEN)]
+        usage = {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}
+        base = {"id": "stub", "created": int(time.time()), "model": body.get("model", "stub")}
+        await asyncio.sleep(latency)
+        if not body.get("stream"):
+            await asyncio.sleep(len(tokens) / tokens_per_second)
+            return JSONResponse({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": usage,
+            })
+
+        async def events():
+            for token in tokens:
+                chunk = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(1 / tokens_per_second)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route("/v1/chat/completions", chat_completions, methods=["POST"])])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_in_thread(latency: float, tokens_per_second: float, port: int = 0) -> str:
+    """Serve the stub from a daemon thread; returns its base URL once it accepts connections."""
+    import uvicorn
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(latency, tokens_per_second), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("Stub LLM server did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.tokens_per_second), host="127.0.0.1", port=args.port)
@@ -1,14 +1,172 @@
+"""Start the API.
+
+    DEBUG=true python run_server.py   # one process, auto-reload on code changes
+    python run_server.py              # production: prefork workers, settings.server_*
+"""
+import asyncio
+import gc
+import logging
+import math
+import os
+import shutil
+import signal
+import time
 import uvicorn
 from app.config import settings
 
+logger = logging.getLogger("uvicorn.error")
+
+STARTUP_FAILURE = 3
+
+
+def available_cpus() -> int:
+    # CPUs this process may actually use: affinity mask, capped by a cgroup v2 quota (docker --cpus)
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def server_config(app) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=settings.server_host,
+        port=settings.server_port,
+        loop=settings.server_loop,
+        http=settings.server_http,
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keep_alive_seconds,
+        timeout_graceful_shutdown=settings.server_graceful_timeout_seconds,
+        access_log=settings.server_access_log,
+        log_level="info",
+    )
+
+
+async def create_schema():
+    from app.database import Base, engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()  # No pooled connections may cross the fork
+
+
+def preload():
+    """Import the app (and load the embedding model) in the parent, so workers share it copy-on-write.
+
+    Only imports and model weights happen here: database pools, the vector store client and job
+    workers are created by the lifespan inside each worker, after fork.
+    """
+    from app.main import app
+    if settings.schema_check == "create_all":
+        # Workers racing to CREATE TABLE would fail; create once here so their create_all is a no-op
+        asyncio.run(create_schema())
+    if settings.server_preload and settings.memory_enabled:
+        from app.langgraph.provider import provider
+        provider.preload()
+    gc.freeze()
+    return app
+
+
+def run_worker(config: uvicorn.Config, sock) -> None:
+    # Runs in the forked child; uvicorn installs its own SIGINT/SIGTERM handlers for graceful shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = uvicorn.Server(config)
+    code = 0
+    try:
+        server.run(sockets=[sock])
+    except BaseException:
+        logger.exception("Worker crashed")
+        code = 1
+    # Never return into the parent's supervisor loop; skip its atexit handlers too
+    os._exit(code if server.started else STARTUP_FAILURE)
+
+
+def supervise(workers: int) -> int:
+    """Prefork supervisor: bind once, fork `workers` servers on the shared socket, restart crashed ones.
+
+    SIGTERM/SIGINT are forwarded to the workers, which stop accepting, finish in-flight requests
+    (server_graceful_timeout_seconds) and drain running jobs (jobs_drain_timeout_seconds) before
+    exiting; workers still alive after both are killed.
+    """
+    from prometheus_client import multiprocess
+    config = server_config(preload())
+    sock = config.bind_socket()
+    children = set()
+    stopping = False
+    exit_code = 0
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            run_worker(config, sock)
+        children.add(pid)
+        logger.info(f"Started worker {pid}")
+
+    def reap() -> list:
+        exited = []
+        while children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            if pid in children:
+                children.discard(pid)
+                multiprocess.mark_process_dead(pid)
+                exited.append((pid, os.waitstatus_to_exitcode(status)))
+        return exited
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    while not stopping:
+        time.sleep(0.5)
+        for pid, code in reap():
+            if code == STARTUP_FAILURE:
+                # Startup failures (e.g. schema check) would fail again; stop instead of respawning
+                logger.error(f"Worker {pid} failed to start, shutting down")
+                stopping, exit_code = True, STARTUP_FAILURE
+            elif not stopping:
+                logger.warning(f"Worker {pid} exited with code {code}, restarting")
+                spawn()
+
+    for pid in children:
+        os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + settings.server_graceful_timeout_seconds + settings.jobs_drain_timeout_seconds + 5
+    while children and time.monotonic() < deadline:
+        reap()
+        time.sleep(0.1)
+    for pid in children:
+        logger.warning(f"Worker {pid} did not stop in time, killing it")
+        os.kill(pid, signal.SIGKILL)
+    while children:
+        reap()
+        time.sleep(0.05)
+    sock.close()
+    return exit_code
+
+
 if __name__ == "__main__":
-    
-    
-    # Start the server
-    uvicorn.run(
-        "app.main:app",            
-        host="0.0.0.0",              
-        port=8000,                   
-        reload=settings.debug,       
-        log_level="info"             
-    )
\ No newline at end of file
+    if settings.debug:
+        uvicorn.run("app.main:app", host=settings.server_host, port=settings.server_port, reload=True, log_level="info")
+    else:
+        workers = settings.server_workers or available_cpus()
+        if workers == 1:
+            uvicorn.Server(server_config(preload())).run()
+        else:
+            # Must be set before prometheus_client is first imported (by app.metrics)
+            shutil.rmtree(settings.metrics_multiprocess_dir, ignore_errors=True)
+            os.makedirs(settings.metrics_multiprocess_dir)
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = settings.metrics_multiprocess_dir
+            raise SystemExit(supervise(workers))
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import tempfile
+import uuid
+
+from benchmarks.stub_llm import start_in_thread
+
+# Settings are read when app is imported: a throwaway SQLite database, in-process backends and
+# the stub OpenAI-compatible server in place of Ollama
+_tmp = tempfile.mkdtemp(prefix="fastapi-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite+aiosqlite:///{_tmp}/test.db",
+    SCHEMA_CHECK="create_all",
+    CACHE_URL="memory://",
+    RATELIMIT_URL="memory://",
+    MEMORY_BACKEND="numpy",
+    OLLAMA_HOST=start_in_thread(latency=0.0, tokens_per_second=10000.0),
+    GENERATION_CACHE_DIR=f"{_tmp}/generation",
+    JOBS_POLL_INTERVAL_SECONDS="0.05",
+)
+
+import httpx
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.langgraph.provider import provider
+from app.main import app
+
+
+class StubEmbedder:
+    """Deterministic stand-in for SentenceTransformer.encode (hashing trick over words)."""
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        vectors = np.zeros((len(texts), settings.embedding_dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+                vectors[row, int.from_bytes(digest[:4], "little") % settings.embedding_dim] += 1 if digest[4] & 1 else -1
+        return vectors
+
+
+provider._embedder = StubEmbedder()
+
+
+# One event loop and one app lifespan for the whole session, as in a worker process: the job
+# queue, admission queue and engine pools are bound to the loop they were started on
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def client():
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
+
+@pytest.fixture
+async def user(client):
+    response = await client.post("/api/v1/users/", json={"name": "Test", "email": f"{uuid.uuid4().hex}@example.com"})
+    response.raise_for_status()
+    return response.json()
+
+
+@pytest.fixture
+async def document(client, user):
+    response = await client.post(
+        "/api/v1/documents/",
+        json={"title": "Photosynthesis", "content": "Plants convert light energy into chemical energy. " * 40, "owner_id": user["id"]},
+    )
+    response.raise_for_status()
+    return response.json()
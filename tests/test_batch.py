@@ -0,0 +1,59 @@
+import uuid
+
+import pytest
+
+from app.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_users_batch_reports_each_item(client, user):
+    email = f"{uuid.uuid4().hex}@example.com"
+    response = await client.post("/api/v1/users/batch", json=[
+        {"name": "A", "email": email},
+        {"name": "B", "email": email},
+        {"name": "C", "email": user["email"]},
+    ])
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (1, 2)
+    assert [item["success"] for item in result["results"]] == [True, False, False]
+    assert result["results"][1]["error"] == "Duplicate email in batch"
+    assert result["results"][2]["error"] == "Email already registered"
+
+    users = (await client.get("/api/v1/users", params={"ids": [result["results"][0]["id"], user["id"]]})).json()
+    assert [u["email"] for u in users] == [email, user["email"]]
+
+
+async def test_questions_batch_and_fetch_by_ids(client, user):
+    quiz = (await client.post("/api/v1/quizzes/", json={"title": "Quiz", "owner_id": user["id"]})).json()
+    items = [{"quiz_id": quiz["id"], "text": f"Question {i}?"} for i in range(5)]
+    items.insert(2, {"quiz_id": 999999, "text": "Orphan?"})
+
+    result = (await client.post("/api/v1/questions/batch", json=items)).json()
+    assert (result["created"], result["failed"]) == (5, 1)
+    assert result["results"][2] == {"index": 2, "success": False, "id": None, "error": "Quiz 999999 not found"}
+    ids = [item["id"] for item in result["results"] if item["success"]]
+
+    # Returned in request order, duplicates collapsed and unknown ids skipped
+    questions = (await client.get("/api/v1/questions", params={"ids": ids[::-1] + ids[:1] + [999999]})).json()
+    assert [q["id"] for q in questions] == ids[::-1]
+    assert [q["text"] for q in questions] == [f"Question {i}?" for i in reversed(range(5))]
+
+
+async def test_documents_batch_checks_owner(client, user):
+    result = (await client.post("/api/v1/documents/batch", json=[
+        {"title": "One", "content": "First body.", "owner_id": user["id"]},
+        {"title": "Two", "content": "Second body.", "owner_id": 999999},
+    ])).json()
+    assert [item["success"] for item in result["results"]] == [True, False]
+
+    documents = (await client.get("/api/v1/documents", params={"ids": [result["results"][0]["id"]]})).json()
+    assert [d["content"] for d in documents] == ["First body."]
+
+
+async def test_batch_size_limit(client, monkeypatch):
+    monkeypatch.setattr(settings, "max_batch_size", 2)
+    assert (await client.get("/api/v1/questions", params={"ids": [1, 2, 3]})).status_code == 413
+    response = await client.post("/api/v1/users/batch", json=[{"name": "x", "email": f"{i}@example.com"} for i in range(3)])
+    assert response.status_code == 413
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import update
+
+from app import models
+from app.database import AsyncSessionLocal, get_read_db
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_etag_not_modified(client, document):
+    url = f"/api/v1/documents/{document['id']}"
+    first = await client.get(url, headers={"accept-encoding": "identity"})
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    response = await client.get(url, headers={"accept-encoding": "identity", "if-none-match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    response = await client.get(url, headers={"accept-encoding": "identity", "if-none-match": '"other"'})
+    assert response.status_code == 200
+
+
+async def test_etag_matches_compressed_representation(client, document):
+    url = f"/api/v1/documents/{document['id']}"
+    first = await client.get(url, headers={"accept-encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    response = await client.get(url, headers={"accept-encoding": "gzip", "if-none-match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+async def test_write_invalidates_cached_parent(client, user):
+    quiz = (await client.post("/api/v1/quizzes/", json={"title": "Quiz", "owner_id": user["id"]})).json()
+    url = f"/api/v1/quizzes/{quiz['id']}?expand=questions"
+    first = await client.get(url)
+    assert first.json()["questions"] == []
+
+    question = {"quiz_id": quiz["id"], "text": "What do plants convert?"}
+    assert (await client.post("/api/v1/questions/", json=question)).status_code == 200
+
+    response = await client.get(url, headers={"if-none-match": first.headers["etag"]})
+    assert response.status_code == 200
+    assert [q["text"] for q in response.json()["questions"]] == ["What do plants convert?"]
+
+
+async def test_fields_projection_bypasses_cache(client, document):
+    url = f"/api/v1/documents/{document['id']}"
+    assert (await client.get(url)).json()["title"] == "Photosynthesis"
+
+    # Changed behind the routes' backs, so nothing invalidates the cached full response
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.Document).where(models.Document.id == document["id"]).values(title="Respiration"))
+        await db.commit()
+
+    assert (await client.get(url)).json()["title"] == "Photosynthesis"
+    assert (await client.get(url, params={"fields": "id,title"})).json() == {"id": document["id"], "title": "Respiration"}
+
+
+async def test_cached_routes_fill_from_primary(client, user, document):
+    quiz = (await client.post("/api/v1/quizzes/", json={"title": "Quiz", "owner_id": user["id"]})).json()
+    question = (await client.post("/api/v1/questions/", json={"quiz_id": quiz["id"], "text": "Why?"})).json()
+
+    async def no_replica():
+        raise AssertionError("cached route read from the replica")
+        yield
+
+    app.dependency_overrides[get_read_db] = no_replica
+    try:
+        for url in (f"/api/v1/users/{user['id']}", f"/api/v1/documents/{document['id']}",
+                    f"/api/v1/quizzes/{quiz['id']}", f"/api/v1/questions/{question['id']}"):
+            assert (await client.get(url)).status_code == 200
+    finally:
+        del app.dependency_overrides[get_read_db]
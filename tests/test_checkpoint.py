@@ -0,0 +1,84 @@
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, StateGraph
+
+from app.langgraph.checkpoint import CompactCheckpointSaver, SQLCheckpointStore, checkpoints, local_sqlite_engine
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def saver(tmp_path):
+    engine = local_sqlite_engine(str(tmp_path / "checkpoints.db"))
+    yield CompactCheckpointSaver(SQLCheckpointStore(engine, keep=2, create_tables=True))
+    await engine.dispose()
+
+
+async def put_step(saver, thread_id, step, parent=None):
+    checkpoint = empty_checkpoint()
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": parent}}
+    return await saver.aput(config, checkpoint, {"step": step, "source": "loop"}, {})
+
+
+async def stored_steps(saver, thread_id):
+    async with saver.store.engine.connect() as conn:
+        rows = await conn.execute(checkpoints.select().where(checkpoints.c.thread_id == thread_id).order_by(checkpoints.c.step))
+        return [row.step for row in rows]
+
+
+async def test_latest_checkpoint_and_pruning(saver):
+    parent = None
+    for step in range(5):
+        config = await put_step(saver, "t", step, parent)
+        parent = config["configurable"]["checkpoint_id"]
+
+    latest = await saver.aget_tuple({"configurable": {"thread_id": "t"}})
+    assert latest.config["configurable"]["checkpoint_id"] == parent
+    assert latest.metadata["step"] == 4
+    assert latest.parent_config is not None
+    assert await stored_steps(saver, "t") == [3, 4]
+
+    listed = [c.metadata["step"] async for c in saver.alist({"configurable": {"thread_id": "t"}})]
+    assert listed == [4, 3]
+
+
+async def test_step_key_is_deterministic(saver):
+    await put_step(saver, "t", 0)
+    config = await put_step(saver, "t", 0)
+    assert await stored_steps(saver, "t") == [0]
+    latest = await saver.aget_tuple({"configurable": {"thread_id": "t"}})
+    assert latest.config["configurable"]["checkpoint_id"] == config["configurable"]["checkpoint_id"]
+
+
+async def test_pending_writes_and_delete_thread(saver):
+    config = await put_step(saver, "t", 0)
+    await saver.aput_writes(config, [("answer", {"value": 42}), ("log", "x" * 1000)], task_id="task")
+    await saver.aput_writes(config, [("answer", {"value": 0})], task_id="task")  # First write wins
+
+    latest = await saver.aget_tuple({"configurable": {"thread_id": "t"}})
+    assert latest.pending_writes == [("task", "answer", {"value": 42}), ("task", "log", "x" * 1000)]
+
+    await put_step(saver, "other", 0)
+    await saver.adelete_thread("t")
+    assert await saver.aget_tuple({"configurable": {"thread_id": "t"}}) is None
+    assert await stored_steps(saver, "other") == [0]
+
+
+class CounterState(TypedDict):
+    seen: Annotated[list, operator.add]
+
+
+async def test_graph_resumes_from_saved_state(saver):
+    graph = StateGraph(CounterState)
+    graph.add_node("visit", lambda state: {"seen": [len(state["seen"])]})
+    graph.set_entry_point("visit")
+    graph.add_edge("visit", END)
+    app = graph.compile(checkpointer=saver)
+
+    config = {"configurable": {"thread_id": "graph"}}
+    await app.ainvoke({"seen": []}, config)
+    final = await app.ainvoke({"seen": []}, config)
+    assert final["seen"] == [0, 1]
@@ -0,0 +1,91 @@
+import pytest
+from fastapi import HTTPException
+
+from app.main import _byte_range
+from app.uploads import content_hash
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=5-", (5, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=90-500", (90, 99)),
+    (None, None),
+    ("items=0-9", None),
+    ("bytes=0-4,10-14", None),
+    ("bytes=a-b", None),
+    ("bytes=9-3", None),
+])
+def test_byte_range(header, expected):
+    assert _byte_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=100-200", "bytes=-0"])
+def test_byte_range_not_satisfiable(header):
+    with pytest.raises(HTTPException) as exc:
+        _byte_range(header, 100)
+    assert exc.value.status_code == 416
+    assert exc.value.headers == {"Content-Range": "bytes */100"}
+
+
+async def test_content_ranges(client, user, monkeypatch):
+    # Small read windows, so ranges span several of them and split multi-byte characters
+    monkeypatch.setattr("app.main.settings.document_chunk_bytes", 7)
+    text = "héllo wörld, " * 10
+    document = (await client.post("/api/v1/documents/", json={"title": "Text", "content": text, "owner_id": user["id"]})).json()
+    url = f"/api/v1/documents/{document['id']}/content"
+    raw = text.encode()
+    identity = {"accept-encoding": "identity"}
+
+    response = await client.get(url, headers=identity)
+    assert response.status_code == 200
+    assert response.content == raw
+    assert response.headers["etag"] == f'"{content_hash(text)}"'
+
+    response = await client.get(url, headers={**identity, "range": "bytes=3-40"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 3-40/{len(raw)}"
+    assert response.content == raw[3:41]
+
+    response = await client.get(url, headers={**identity, "range": "bytes=9-3"})
+    assert response.status_code == 200
+    assert response.content == raw
+
+    response = await client.get(url, headers={**identity, "range": f"bytes={len(raw)}-"})
+    assert response.status_code == 416
+
+
+async def test_batch_documents_are_hashed(client, user):
+    text = "Batch created text about chloroplasts."
+    response = await client.post("/api/v1/documents/batch", json=[{"title": "Batch", "content": text, "owner_id": user["id"]}])
+    document_id = response.json()["results"][0]["id"]
+
+    response = await client.get(f"/api/v1/documents/{document_id}/content")
+    assert response.headers["etag"] == f'"{content_hash(text)}"'
+
+    files = {"file": ("batch.txt", text.encode(), "text/plain")}
+    response = await client.post("/api/v1/documents/upload", data={"title": "Again", "owner_id": str(user["id"])}, files=files)
+    assert response.status_code == 200
+    assert response.json()["duplicate"] is True
+    assert response.json()["id"] == document_id
+
+
+async def test_uploaded_content_ranges(client, user, monkeypatch):
+    # Uploads store the slices they staged, cut at text boundaries rather than every document_chunk_bytes
+    monkeypatch.setattr("app.uploads.settings.document_chunk_bytes", 64)
+    text = "".join(f"Line {i}: ünïcode text about mitochondria.\n" for i in range(50))
+    files = {"file": ("cells.txt", text.encode(), "text/plain")}
+    response = await client.post("/api/v1/documents/upload", data={"title": "Cells", "owner_id": str(user["id"])}, files=files)
+    assert response.status_code == 201
+    url = f"/api/v1/documents/{response.json()['id']}/content"
+    raw = text.encode()
+
+    response = await client.get(url, headers={"accept-encoding": "identity"})
+    assert response.content == raw
+    for first, last in [(0, 0), (60, 200), (1000, len(raw) - 1)]:
+        response = await client.get(url, headers={"accept-encoding": "identity", "range": f"bytes={first}-{last}"})
+        assert response.status_code == 206
+        assert response.content == raw[first:last + 1]
@@ -0,0 +1,91 @@
+import os
+import uuid
+
+import pytest
+
+from app.langgraph import utils
+from app.langgraph.utils import GenerationCache
+from app.metrics import GENERATION_CACHE_LOOKUPS
+
+from .test_jobs import wait_for_job
+
+pytestmark = pytest.mark.anyio
+
+
+def lookups(result):
+    return GENERATION_CACHE_LOOKUPS.labels(result)._value.get()
+
+
+async def test_cache_round_trip_and_counters(tmp_path):
+    cache = GenerationCache(str(tmp_path), max_bytes=1 << 20)
+    key = GenerationCache.make_key("text", "model", "template", 0.7)
+    hits, misses = lookups("hit"), lookups("miss")
+
+    assert await cache.get(key) is None
+    await cache.set(key, {"question": "Q?"})
+    assert await cache.get(key) == {"question": "Q?"}
+    assert (lookups("hit") - hits, lookups("miss") - misses) == (1, 1)
+
+    disabled = GenerationCache(str(tmp_path), max_bytes=1 << 20, enabled=False)
+    assert await disabled.get(key) is None
+
+
+def test_key_covers_model_template_and_temperature():
+    base = GenerationCache.make_key("text", "model", "template", 0.7)
+    assert base == GenerationCache.make_key("text", "model", "template", 0.7)
+    assert len({
+        base,
+        GenerationCache.make_key("other text", "model", "template", 0.7),
+        GenerationCache.make_key("text", "other-model", "template", 0.7),
+        GenerationCache.make_key("text", "model", "other template", 0.7),
+        GenerationCache.make_key("text", "model", "template", 0.2),
+    }) == 5
+
+
+async def test_cache_evicts_least_recently_used(tmp_path):
+    value = {"question": "x" * 100}
+    cache = GenerationCache(str(tmp_path), max_bytes=400)  # Room for three entries
+    keys = [GenerationCache.make_key(str(i), "model", "template", 0.7) for i in range(4)]
+    for age, key in enumerate(keys[:3]):
+        await cache.set(key, value)
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    assert await cache.get(keys[0]) is not None  # Reading refreshes the oldest entry
+
+    await cache.set(keys[3], value)
+    assert [await cache.get(key) is not None for key in keys] == [True, False, True, True]
+
+
+async def test_repeat_run_is_served_from_cache(client, user, monkeypatch):
+    # Unique text so earlier tests cannot have warmed the cache for it
+    content = f"Mitochondria {uuid.uuid4().hex} produce ATP through respiration. " * 40
+    document = (await client.post("/api/v1/documents/", json={"title": "Cells", "content": content, "owner_id": user["id"]})).json()
+
+    prompts, recalls = [], []
+    chat_completion, recall_history = utils.chat_completion, utils.recall_history
+
+    async def counting_chat_completion(prompt, **kwargs):
+        prompts.append(prompt)
+        return await chat_completion(prompt, **kwargs)
+
+    async def counting_recall_history(state, document_text):
+        recalls.append(document_text)
+        return await recall_history(state, document_text)
+
+    monkeypatch.setattr(utils, "chat_completion", counting_chat_completion)
+    monkeypatch.setattr(utils, "recall_history", counting_recall_history)
+
+    async def run():
+        job = (await client.post(f"/api/v1/documents/{document['id']}/jobs", json={"num_questions": 2})).json()
+        job = await wait_for_job(client, job["id"])
+        assert job["status"] == "succeeded", job
+        return job
+
+    await run()
+    assert prompts and len(recalls) == 1
+
+    # The second run recalls the first run's questions, but the cache key ignores them
+    prompts.clear()
+    recalls.clear()
+    await run()
+    assert prompts == []
+    assert recalls == []
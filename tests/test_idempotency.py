@@ -0,0 +1,60 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app import models
+from app.database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+
+def new_user():
+    return {"name": "Test", "email": f"{uuid.uuid4().hex}@example.com"}
+
+
+async def test_retry_replays_stored_response(client):
+    headers = {"idempotency-key": uuid.uuid4().hex}
+    body = new_user()
+    first = await client.post("/api/v1/users/", json=body, headers=headers)
+    assert first.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+
+    retry = await client.post("/api/v1/users/", json=body, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+
+
+async def test_reused_key_with_different_body_is_rejected(client):
+    headers = {"idempotency-key": uuid.uuid4().hex}
+    assert (await client.post("/api/v1/users/", json=new_user(), headers=headers)).status_code == 200
+
+    response = await client.post("/api/v1/users/", json=new_user(), headers=headers)
+    assert response.status_code == 422
+
+
+async def test_key_in_progress_conflicts(client):
+    key = uuid.uuid4().hex
+    async with AsyncSessionLocal() as db:
+        db.add(models.IdempotencyKey(key=key, created_at=datetime.now(timezone.utc)))
+        await db.commit()
+
+    response = await client.post("/api/v1/users/", json=new_user(), headers={"idempotency-key": key})
+    assert response.status_code == 409
+
+
+async def test_client_error_is_replayed(client, user):
+    headers = {"idempotency-key": uuid.uuid4().hex}
+    duplicate = {"name": "Test", "email": user["email"]}
+    first = await client.post("/api/v1/users/", json=duplicate, headers=headers)
+    assert first.status_code == 400
+
+    retry = await client.post("/api/v1/users/", json=duplicate, headers=headers)
+    assert retry.status_code == 400
+    assert retry.headers["idempotent-replayed"] == "true"
+
+
+async def test_invalid_key(client):
+    response = await client.post("/api/v1/users/", json=new_user(), headers={"idempotency-key": "x" * 256})
+    assert response.status_code == 400
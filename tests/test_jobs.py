@@ -0,0 +1,86 @@
+import asyncio
+
+import orjson
+import pytest
+from sqlalchemy import func, select
+
+from app.database import AsyncSessionLocal
+from app.jobs import job_queue
+from app.models import WorkflowCheckpoint
+
+pytestmark = pytest.mark.anyio
+
+
+async def checkpoint_count(thread_id_like):
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).where(WorkflowCheckpoint.thread_id.like(thread_id_like)))
+
+
+async def wait_for_job(client, job_id, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = (await client.get(f"/api/v1/jobs/{job_id}")).json()
+        if job["status"] not in ("pending", "running"):
+            return job
+        assert asyncio.get_running_loop().time() < deadline, f"job {job_id} still {job['status']}"
+        await asyncio.sleep(0.05)
+
+
+async def test_job_lifecycle(client, document):
+    response = await client.post(f"/api/v1/documents/{document['id']}/jobs", json={"num_questions": 3})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] in ("pending", "running")  # A worker may claim it before the response is built
+
+    job = await wait_for_job(client, job["id"])
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 1
+    result = (await client.get(f"/api/v1/jobs/{job['id']}/result")).json()["result"]
+    assert len(result["question_ids"]) == 3
+
+    quiz = (await client.get(f"/api/v1/quizzes/{result['quiz_id']}", params={"expand": "questions"})).json()
+    assert [q["id"] for q in quiz["questions"]] == result["question_ids"]
+    assert all(q["correct_answer"] for q in quiz["questions"])
+    assert await checkpoint_count(f"job-{job['id']}") == 0
+
+    # Finished jobs cannot be cancelled
+    assert (await client.post(f"/api/v1/jobs/{job['id']}/cancel")).status_code == 409
+
+
+async def test_cancel_running_job(client, document, monkeypatch):
+    started = asyncio.Event()
+
+    async def slow_runner(job):
+        started.set()
+        await asyncio.sleep(30)
+
+    monkeypatch.setattr(job_queue, "runner", slow_runner)
+    job = (await client.post(f"/api/v1/documents/{document['id']}/jobs", json={})).json()
+    await asyncio.wait_for(started.wait(), timeout=5)
+
+    assert (await client.post(f"/api/v1/jobs/{job['id']}/cancel")).json()["cancel_requested"] is True
+    job = await wait_for_job(client, job["id"])
+    assert job["status"] == "cancelled"
+    assert job["finished_at"] is not None
+
+
+async def test_stream_quiz(client, document):
+    events = []
+    async with client.stream("GET", f"/api/v1/documents/{document['id']}/quiz/stream", params={"num_questions": 2}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                events.append(orjson.loads(line[len("data: "):]))
+
+    kinds = [event["event"] for event in events]
+    assert "error" not in kinds, events
+    assert kinds.count("question") == 2
+    assert kinds[-1] == "quiz"
+    assert len(events[-1]["question_ids"]) == 2
+    assert await checkpoint_count("stream-%") == 0
+
+
+async def test_stream_unknown_document(client):
+    response = await client.get("/api/v1/documents/999999/quiz/stream")
+    assert response.status_code == 404
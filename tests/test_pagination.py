@@ -0,0 +1,74 @@
+import contextlib
+
+import pytest
+from sqlalchemy import event
+
+from app.database import read_engine
+
+pytestmark = pytest.mark.anyio
+
+
+@contextlib.contextmanager
+def count_queries():
+    statements = []
+
+    # The job queue polls in the background; only quiz and question reads are counted
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "FROM quizzes" in statement or "FROM questions" in statement:
+            statements.append(statement)
+
+    event.listen(read_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(read_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def make_quiz(client, user, questions):
+    quiz = (await client.post("/api/v1/quizzes/", json={"title": "Quiz", "owner_id": user["id"]})).json()
+    result = (await client.post("/api/v1/questions/batch", json=[
+        {"quiz_id": quiz["id"], "text": f"Q{i}?"} for i in range(questions)
+    ])).json()
+    return quiz, [item["id"] for item in result["results"]]
+
+
+async def test_keyset_pages_cover_every_row_once(client, user):
+    quiz, ids = await make_quiz(client, user, 5)
+    seen, after, pages = [], None, 0
+    while True:
+        params = {"limit": 2} if after is None else {"limit": 2, "after": after}
+        page = (await client.get(f"/api/v1/quizzes/{quiz['id']}/questions", params=params)).json()
+        seen += [q["id"] for q in page["items"]]
+        pages += 1
+        after = page["next_cursor"]
+        if after is None:
+            break
+    assert seen == ids
+    assert pages == 3
+
+    # An exactly full last page has no next cursor
+    page = (await client.get(f"/api/v1/quizzes/{quiz['id']}/questions", params={"limit": 5})).json()
+    assert len(page["items"]) == 5 and page["next_cursor"] is None
+
+
+async def test_expanded_quizzes_use_constant_queries(client, user):
+    for size in (1, 3, 4):
+        await make_quiz(client, user, size)
+
+    with count_queries() as statements:
+        page = (await client.get(f"/api/v1/users/{user['id']}/quizzes", params={"expand": "questions"})).json()
+    assert [len(q["questions"]) for q in page["items"]] == [1, 3, 4]
+    assert len(statements) == 2  # The quiz page, then one selectin load for all their questions
+
+    page = (await client.get(f"/api/v1/users/{user['id']}/quizzes", params={"limit": 2})).json()
+    assert "questions" not in page["items"][0]
+    assert page["next_cursor"] == page["items"][1]["id"]
+
+
+async def test_user_nested_expansion(client, user, document):
+    await make_quiz(client, user, 2)
+    detail = (await client.get(f"/api/v1/users/{user['id']}", params={"expand": "quizzes.questions,documents"})).json()
+    assert [len(q["questions"]) for q in detail["quizzes"]] == [2]
+    assert [d["id"] for d in detail["documents"]] == [document["id"]]
+
+    assert (await client.get(f"/api/v1/users/{user['id']}", params={"expand": "friends"})).status_code == 400
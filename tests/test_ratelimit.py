@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.ratelimit import AdmissionQueue, InMemoryRateLimitBackend, Overloaded, RateLimiter
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_user_bucket_refuses_after_burst():
+    limiter = RateLimiter(InMemoryRateLimitBackend())
+    for _ in range(settings.ratelimit_user_burst):
+        await limiter.check(1)
+    with pytest.raises(Overloaded) as exc:
+        await limiter.check(1)
+    assert exc.value.reason == "Rate limit exceeded for this user"
+    assert exc.value.retry_after >= 1
+    # Other users have their own bucket
+    await limiter.check(2)
+
+
+async def test_refused_request_takes_no_tokens():
+    backend = InMemoryRateLimitBackend()
+    assert await backend.acquire([("a", 1.0, 1), ("b", 1.0, 1)]) == [0.0, 0.0]
+    waits = await backend.acquire([("c", 1.0, 1), ("a", 1.0, 1)])
+    assert waits[0] == 0.0 and waits[1] > 0
+    # "c" was not charged for the refused request
+    assert await backend.acquire([("c", 1.0, 1)]) == [0.0]
+
+
+async def test_disabled_limiter_always_admits():
+    limiter = RateLimiter(InMemoryRateLimitBackend(), enabled=False)
+    for _ in range(settings.ratelimit_user_burst + 5):
+        await limiter.check(1)
+
+
+async def test_admission_queue_refuses_when_full():
+    queue = AdmissionQueue(max_running=1, max_waiting=1, max_wait=5)
+    running = await queue.acquire()
+    waiter = asyncio.create_task(queue.acquire())
+    await asyncio.sleep(0)
+    assert (queue.running, queue.waiting) == (1, 1)
+
+    with pytest.raises(Overloaded) as exc:
+        await queue.acquire()
+    assert exc.value.reason == "Quiz generation queue is full"
+
+    running.release()
+    running.release()  # Idempotent: frees one slot only
+    second = await waiter
+    assert (queue.running, queue.waiting) == (1, 0)
+    second.release()
+    assert queue.running == 0
+
+
+async def test_admission_wait_times_out():
+    queue = AdmissionQueue(max_running=1, max_waiting=1, max_wait=0.01)
+    async with queue.slot():
+        with pytest.raises(Overloaded) as exc:
+            await queue.acquire()
+        assert exc.value.reason == "Timed out waiting for a quiz generation slot"
+        assert queue.waiting == 0
+
+
+async def test_background_jobs_wait_instead_of_being_refused():
+    queue = AdmissionQueue(max_running=1, max_waiting=0, max_wait=0.01)
+    running = await queue.acquire()
+    waiter = asyncio.create_task(queue.acquire(reject=False))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+    running.release()
+    (await waiter).release()
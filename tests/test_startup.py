@@ -0,0 +1,25 @@
+import pytest
+
+from app.config import settings
+from app.jobs import quiz_graph
+from app.langgraph.memory import get_memory, save_memory
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_lifespan_starts_memory_provider(client):
+    assert settings.memory_enabled
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["checks"] == {"database": "ok", "vector_store": "ok"}
+
+
+async def test_workflows_compile():
+    assert quiz_graph(batch=False) is quiz_graph(batch=False)
+    assert quiz_graph(batch=True) is not quiz_graph(batch=False)
+
+
+async def test_memory_round_trip(client):
+    await save_memory(9001, [{"user": "Requested quiz on photosynthesis", "bot": "Generated question: What is chlorophyll?"}])
+    turns = await get_memory(9001, "photosynthesis chlorophyll", 3)
+    assert [turn["bot"] for turn in turns] == ["Generated question: What is chlorophyll?"]
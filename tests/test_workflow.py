@@ -0,0 +1,50 @@
+import uuid
+
+import pytest
+
+from app.database import AsyncSessionLocal
+from app.jobs import quiz_graph, quiz_state
+from app.langgraph import utils
+
+pytestmark = pytest.mark.anyio
+
+
+async def run_graph(document, user, **state):
+    session_id = f"test-{uuid.uuid4().hex}"
+    async with AsyncSessionLocal() as db:
+        return await quiz_graph(False).ainvoke(
+            {**quiz_state(session_id, user["id"], document["id"]), **state},
+            config={"configurable": {"thread_id": session_id, "db": db}},
+        )
+
+
+async def test_no_transaction_during_generation(client, user, document, monkeypatch):
+    sessions, open_during_llm = [], []
+    get_session, stream_chat_completion = utils.get_session, utils.stream_chat_completion
+
+    def recording_get_session(config):
+        sessions.append(get_session(config))
+        return sessions[-1]
+
+    async def checking_stream_chat_completion(prompt, **kwargs):
+        open_during_llm.extend(db.in_transaction() for db in sessions)
+        async for delta in stream_chat_completion(prompt, **kwargs):
+            yield delta
+
+    monkeypatch.setattr(utils, "get_session", recording_get_session)
+    monkeypatch.setattr(utils, "stream_chat_completion", checking_stream_chat_completion)
+
+    # Fresh text, so the generation cache cannot answer for the model
+    text = f"Glaciers {uuid.uuid4().hex} carve valleys as they move. " * 20
+    final = await run_graph(document, user, document_text=text)
+    assert final["quiz_id"]
+    assert open_during_llm and not any(open_during_llm)
+
+    # The new text is stored with the quiz
+    content = await client.get(f"/api/v1/documents/{document['id']}/content")
+    assert content.text == text
+
+
+async def test_unknown_document_is_rejected(client, user):
+    with pytest.raises(Exception, match="not found"):
+        await run_graph({"id": 999999}, user, document_text="Orphan text.")